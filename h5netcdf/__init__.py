@@ -14,3 +14,4 @@ except Exception:
     __version__ = "999"
 
 from .core import CompatibilityError, Dimension, File, Group, Variable  # noqa
+from .tools import aggregate, repack  # noqa
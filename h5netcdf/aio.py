@@ -0,0 +1,148 @@
+"""asyncio interface to h5netcdf files.
+
+Every blocking call into the backend is run in a worker thread, so that
+variable reads, attribute fetches and group listings can be awaited and
+issued concurrently, eg. with :func:`asyncio.gather`. This is most useful
+with the 'h5pyd' backend, where each of those calls is an HTTP round trip.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .core import File
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+
+class AsyncFile:
+    """Asynchronous wrapper around :class:`h5netcdf.File`.
+
+    Parameters
+    ----------
+    path : path-like or str
+        Location of the file, eg. an HSDS domain for ``backend="h5pyd"``.
+    mode : "r", "r+", "a", "w"
+        A valid file access mode. Defaults to "r".
+    max_concurrency : int
+        Maximum number of backend calls in flight at the same time, each
+        runs in a thread of a pool of this size owned by the file.
+    **kwargs :
+        Additional keyword arguments passed to :class:`h5netcdf.File`.
+
+    Examples
+    --------
+    >>> async with AsyncFile("/home/user/data.h5", backend="h5pyd") as f:
+    ...     names = await f.variables()
+    ...     arrays = await asyncio.gather(*(f.read(n) for n in names))
+    """
+
+    def __init__(
+        self, path, mode="r", max_concurrency=DEFAULT_MAX_CONCURRENCY, **kwargs
+    ):
+        if max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency needs to be a positive integer, got {max_concurrency!r}"
+            )
+        self._path = path
+        self._mode = mode
+        self._kwargs = kwargs
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._executor = None
+        self._file = None
+
+    async def _run(self, func, *args, **kwargs):
+        # the semaphore is created lazily to bind it to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_concurrency,
+                thread_name_prefix="h5netcdf-aio",
+            )
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    @property
+    def file(self):
+        """The underlying :class:`h5netcdf.File`."""
+        if self._file is None:
+            raise ValueError("AsyncFile is not open")
+        return self._file
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    async def open(self):
+        """Open the underlying file in a worker thread."""
+        if self._file is None:
+            self._file = await self._run(
+                functools.partial(File, self._path, self._mode, **self._kwargs)
+            )
+        return self
+
+    async def close(self):
+        """Close the underlying file in a worker thread and stop the threads."""
+        if self._file is not None:
+            await self._run(self._file.close)
+            self._file = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _get(self, name):
+        return self.file if name in ("", "/") else self.file[name]
+
+    async def read(self, name, key=Ellipsis):
+        """Read ``key`` of variable ``name`` (eg. ``"grp/temp"``)."""
+
+        def read():
+            return self._get(name)[key]
+
+        return await self._run(read)
+
+    async def read_many(self, names, key=Ellipsis):
+        """Concurrently read ``key`` of all variables in ``names``.
+
+        Returns a dictionary mapping names to arrays.
+        """
+        arrays = await asyncio.gather(*(self.read(name, key) for name in names))
+        return dict(zip(names, arrays))
+
+    async def attrs(self, name="/"):
+        """Return the attributes of the group or variable ``name`` as dict."""
+
+        def attrs():
+            return dict(self._get(name).attrs)
+
+        return await self._run(attrs)
+
+    async def variables(self, group="/"):
+        """Return the names of the variables in ``group``."""
+        return await self._run(lambda: list(self._get(group).variables))
+
+    async def groups(self, group="/"):
+        """Return the names of the child groups of ``group``."""
+        return await self._run(lambda: list(self._get(group).groups))
+
+    async def dimensions(self, group="/"):
+        """Return a dictionary mapping dimension names to sizes in ``group``."""
+
+        def dimensions():
+            return {k: v.size for k, v in self._get(group).dimensions.items()}
+
+        return await self._run(dimensions)
+
+    def __repr__(self):
+        state = "closed" if self.closed else f"mode {self._mode!r}"
+        return f"<h5netcdf.aio.AsyncFile {self._path!r} ({state})>"
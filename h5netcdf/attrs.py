@@ -23,11 +23,15 @@ _string_info = namedtuple("string_info", ["encoding", "length"])
 
 
 class Attributes(MutableMapping):
-    def __init__(self, h5attrs, check_dtype, h5py_pckg, format="NETCDF4"):
+    def __init__(
+        self, h5attrs, check_dtype, h5py_pckg, format="NETCDF4", on_change=None
+    ):
         self._h5attrs = h5attrs
         self._check_dtype = check_dtype
         self._h5py = h5py_pckg
         self._format = format
+        # called after attributes have been written or deleted
+        self._on_change = on_change
 
     def __getitem__(self, key):
         if key in _HIDDEN_ATTRS:
@@ -122,9 +126,13 @@ class Attributes(MutableMapping):
             if np.isscalar(value) and dtype.kind not in {"S", "U"}:
                 value = np.atleast_1d(value)
             self._h5attrs[key] = value
+        if self._on_change is not None:
+            self._on_change()
 
     def __delitem__(self, key):
         del self._h5attrs[key]
+        if self._on_change is not None:
+            self._on_change()
 
     def __iter__(self):
         for key in self._h5attrs:
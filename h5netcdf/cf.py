@@ -0,0 +1,128 @@
+"""CF mask and scale decoding.
+
+The attributes relevant for decoding (``_FillValue``, ``missing_value``,
+``valid_min``, ``valid_max``, ``valid_range``, ``scale_factor`` and
+``add_offset``) are collected once per variable. The raw data is then
+decoded block by block into a preallocated output, applying scale, offset
+and mask to each block before moving on to the next one. Temporaries are
+therefore only block sized instead of full size arrays per step.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+#: number of elements decoded at once, small enough to stay in the CPU cache
+BLOCK_SIZE = 64 * 1024
+
+#: approximate size of the raw data read at once by ``Variable.read``
+SLAB_NBYTES = 4 * 2**20
+
+CFParams = namedtuple(
+    "CFParams",
+    ["fill_values", "valid_min", "valid_max", "scale_factor", "add_offset"],
+)
+
+
+def _scalar(value):
+    value = np.asarray(value)
+    return value.reshape(-1)[0] if value.size else None
+
+
+def cf_params(attrs):
+    """Collect the decoding parameters from the attribute mapping ``attrs``."""
+    fill_values = []
+    for name in ("_FillValue", "missing_value"):
+        if name in attrs:
+            fill_values.extend(np.asarray(attrs[name]).reshape(-1))
+    valid_min = _scalar(attrs["valid_min"]) if "valid_min" in attrs else None
+    valid_max = _scalar(attrs["valid_max"]) if "valid_max" in attrs else None
+    if "valid_range" in attrs:
+        valid_range = np.asarray(attrs["valid_range"]).reshape(-1)
+        if valid_range.size == 2:
+            valid_min, valid_max = valid_range
+    scale_factor = _scalar(attrs["scale_factor"]) if "scale_factor" in attrs else None
+    add_offset = _scalar(attrs["add_offset"]) if "add_offset" in attrs else None
+    return CFParams(tuple(fill_values), valid_min, valid_max, scale_factor, add_offset)
+
+
+def _needs_mask(params):
+    return bool(params.fill_values) or not (
+        params.valid_min is None and params.valid_max is None
+    )
+
+
+def _needs_scale(params):
+    return params.scale_factor is not None or params.add_offset is not None
+
+
+def decoded_dtype(params, dtype, mask=True, scale=True, masked=False):
+    """Return the dtype of the decoded data of raw ``dtype``.
+
+    Scaled data gets the dtype of ``scale_factor`` and ``add_offset``. Masked
+    integer data is promoted to float (unless a masked array is returned),
+    as masked values are set to NaN.
+    """
+    dtype = np.dtype(dtype)
+    if scale and _needs_scale(params):
+        values = [v for v in (params.scale_factor, params.add_offset) if v is not None]
+        scaled = np.result_type(*values)
+        return scaled if scaled.kind in "fc" else np.dtype("f8")
+    if mask and not masked and _needs_mask(params) and dtype.kind in "iu":
+        return np.dtype("f4") if dtype.itemsize <= 2 else np.dtype("f8")
+    return dtype
+
+
+def _invalid(raw, params):
+    """Return boolean mask of the invalid elements of ``raw``."""
+    invalid = np.zeros(raw.shape, dtype=bool)
+    for fillvalue in params.fill_values:
+        if isinstance(fillvalue, np.floating) and np.isnan(fillvalue):
+            invalid |= np.isnan(raw)
+        else:
+            invalid |= raw == fillvalue
+    if params.valid_min is not None:
+        invalid |= raw < params.valid_min
+    if params.valid_max is not None:
+        invalid |= raw > params.valid_max
+    return invalid
+
+
+def decode_into(raw, out, params, mask=True, scale=True, out_mask=None):
+    """Decode ``raw`` into the preallocated ``out`` of the same shape.
+
+    Both arrays need to be C-contiguous. Invalid elements are written to
+    ``out_mask`` if given, otherwise they are set to NaN in ``out``.
+    """
+    mask = mask and _needs_mask(params)
+    scale = scale and _needs_scale(params)
+    if mask and out_mask is None and out.dtype.kind not in "fc":
+        raise ValueError(
+            f"masked values can not be represented with dtype {out.dtype}, "
+            "use a floating point out_dtype"
+        )
+    dtype = out.dtype
+    scale_factor = (
+        None if params.scale_factor is None else dtype.type(params.scale_factor)
+    )
+    add_offset = None if params.add_offset is None else dtype.type(params.add_offset)
+
+    src = raw.reshape(-1)
+    dst = out.reshape(-1)
+    dst_mask = None if out_mask is None else out_mask.reshape(-1)
+    for start in range(0, src.size, BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        s, d = src[block], dst[block]
+        if scale and scale_factor is not None:
+            np.multiply(s, scale_factor, out=d, dtype=dtype, casting="unsafe")
+        else:
+            np.copyto(d, s, casting="unsafe")
+        if scale and add_offset is not None:
+            np.add(d, add_offset, out=d)
+        if mask:
+            invalid = _invalid(s, params)
+            if dst_mask is not None:
+                dst_mask[block] = invalid
+            else:
+                d[invalid] = np.nan
+    return out
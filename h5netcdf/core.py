@@ -1,17 +1,33 @@
 # For details on how netCDF4 builds on HDF5:
 # https://docs.unidata.ucar.edu/netcdf-c/current/file_format_specifications.html#netcdf_4_spec
+import html
+import itertools
 import os
 import warnings
 import weakref
-from collections import ChainMap, Counter, OrderedDict, defaultdict
+from collections import ChainMap, Counter, OrderedDict, defaultdict, deque
 from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from packaging import version
 
 from . import __version__
 from .attrs import Attributes
+from .cf import SLAB_NBYTES, cf_params, decode_into, decoded_dtype
 from .dimensions import Dimension, Dimensions, _check_classic_unlimited
+from .indexing import _expand_key, outer_index, read_coalesced
+from .lazy import LazyArray
+from .parallel import read_chunks_pyfive, write_chunks_h5py
+from .references import export_references
+from .sessions import _use_pool
+from .stats import (
+    STATS_PREFIX,
+    find_stats,
+    load_stats,
+    matching_chunks,
+    update_stats,
+)
 from .utils import (
     CompatibilityError,
     Frozen,
@@ -46,6 +62,14 @@ else:
 
 NOT_A_VARIABLE = b"This is a netCDF dimension but not a netCDF variable."
 
+#: default number of members listed per section of the repr
+_REPR_MAX_ITEMS = 50
+
+_GROWTH_POLICIES = (None, "chunks", "geometric")
+
+#: default bound of the memory held by ``Variable.iter_along``
+_ITER_MAX_BYTES = 64 * 2**20
+
 
 def _join_h5paths(parent_path, child_path):
     return "/".join([parent_path.rstrip("/"), child_path.lstrip("/")])
@@ -118,6 +142,61 @@ def _expanded_indexer(key, ndim):
     return key[k1] + res_dims + key[k2]
 
 
+def _basic_selection(key, shape):
+    """Normalize a basic indexing key against the given shape.
+
+    Only integers, slices and Ellipsis are supported.
+
+    Returns
+    -------
+    selection : list of tuple
+        Normalized ``(start, stop, step)`` per axis.
+    squeeze : tuple of bool
+        Axes which are indexed by integers and are dropped from the result.
+    """
+    key = np.index_exp[key]
+    for k in key:
+        if not (isinstance(k, (slice, int, np.integer)) or k is Ellipsis):
+            raise TypeError(
+                f"only integers, slices and Ellipsis are supported, got {k!r}"
+            )
+    ellipsis = [i for i, k in enumerate(key) if k is Ellipsis]
+    if len(ellipsis) > 1:
+        raise IndexError(
+            f"an index can only have a single ellipsis ('...'), {len(ellipsis)} given"
+        )
+    ndim = len(shape)
+    nkey = len(key) - len(ellipsis)
+    if nkey > ndim:
+        raise IndexError(
+            f"too many indices for array: array is {ndim}-dimensional, but {nkey} were indexed"
+        )
+    fill = (slice(None),) * (ndim - nkey)
+    if ellipsis:
+        key = key[: ellipsis[0]] + fill + key[ellipsis[0] + 1 :]
+    else:
+        key = key + fill
+
+    selection = []
+    squeeze = []
+    for axis, (k, size) in enumerate(zip(key, shape)):
+        if isinstance(k, slice):
+            start, stop, step = k.indices(size)
+            if step < 1:
+                raise ValueError("only positive slice steps are supported")
+            selection.append((start, max(start, stop), step))
+            squeeze.append(False)
+        else:
+            index = int(k) + size if k < 0 else int(k)
+            if not 0 <= index < size:
+                raise IndexError(
+                    f"index {k} is out of bounds for axis {axis} with size {size}"
+                )
+            selection.append((index, index + 1, 1))
+            squeeze.append(True)
+    return selection, tuple(squeeze)
+
+
 def _parse_backend(path, mode, backend, **kwargs):
     """Parse the 'backend' keyword to File.__init__.
 
@@ -385,14 +464,99 @@ class BaseVariable(BaseObject):
     def __init__(self, parent, name, dimensions=None):
         super().__init__(parent, name)
         self._dimensions = dimensions
+        self._cf_cache = None
         self._initialized = True
 
+    @property
+    def _h5ds(self):
+        root = self._root
+        # dataset handle opened with a variable specific chunk cache
+        if root._chunk_cache_handles:
+            if (h5ds := root._chunk_cache_handles.get(self._h5path)) is not None:
+                return h5ds
+        if self._h5path in root._chunk_cache:
+            self.set_chunk_cache(**root._chunk_cache.pop(self._h5path))
+            return root._chunk_cache_handles[self._h5path]
+        return root._h5file[self._h5path]
+
     @property
     def name(self):
         """Return variable name."""
         # fix name if _nc4_non_coord_
         return super().name.replace("_nc4_non_coord_", "")
 
+    @property
+    def chunk_cache(self):
+        """Raw data chunk cache parameters as dict of nbytes, nslots and w0."""
+        if self._backend != "h5py":
+            raise ValueError(
+                f"chunk cache is not supported by the {self._backend!r} backend"
+            )
+        nslots, nbytes, w0 = self._h5ds.id.get_access_plist().get_chunk_cache()
+        return {"nbytes": nbytes, "nslots": nslots, "w0": w0}
+
+    def set_chunk_cache(self, nbytes=None, nslots=None, w0=None):
+        """Set the raw data chunk cache of this variable.
+
+        The cache is kept for as long as the file is open. HDF5 shares the
+        cache between all open handles of a dataset, so the settings only take
+        effect if no other handle to the underlying HDF5 dataset is open.
+
+        Parameters
+        ----------
+        nbytes : int or "auto", optional
+            Size of the cache in bytes. With "auto" the cache is sized to hold
+            at least one row of chunks along the slowest varying axis, but is
+            never smaller than the file default.
+        nslots : int, optional
+            Number of hash table slots, should be a prime number. Derived
+            from the cache size for ``nbytes="auto"``.
+        w0 : float, optional
+            Preemption policy between 0 and 1, see the HDF5 documentation.
+            Defaults to 0.75 for ``nbytes="auto"``.
+
+        Parameters which are not given keep their current value.
+        """
+        root = self._root
+        if self._backend != "h5py":
+            raise ValueError(
+                f"chunk cache is not supported by the {self._backend!r} backend"
+            )
+        if w0 is not None and not 0 <= w0 <= 1:
+            raise ValueError(f"w0 needs to be between 0 and 1, got {w0}")
+        h5py = root._h5py
+        _, default_nslots, default_nbytes, default_w0 = (
+            root._h5file.id.get_access_plist().get_cache()
+        )
+        min_nbytes = default_nbytes
+        current = root._chunk_cache_handles.pop(self._h5path, None)
+        if current is not None:
+            # keep the parameters of the current cache which are not given
+            default_nslots, default_nbytes, default_w0 = (
+                current.id.get_access_plist().get_chunk_cache()
+            )
+            del current
+        if nbytes == "auto":
+            h5ds = root._h5file[self._h5path]
+            if h5ds.chunks is None:
+                # contiguous datasets do not use the chunk cache
+                nbytes, auto_nslots = default_nbytes, default_nslots
+            else:
+                nbytes, auto_nslots = _auto_chunk_cache(
+                    h5ds.shape, h5ds.chunks, h5ds.dtype, min_nbytes
+                )
+            del h5ds
+            nslots = auto_nslots if nslots is None else nslots
+            w0 = 0.75 if w0 is None else w0
+        nbytes = default_nbytes if nbytes is None else int(nbytes)
+        nslots = default_nslots if nslots is None else int(nslots)
+        w0 = default_w0 if w0 is None else float(w0)
+
+        dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+        dapl.set_chunk_cache(nslots, nbytes, w0)
+        dsid = h5py.h5d.open(root._h5file.id, self._h5path.encode(), dapl=dapl)
+        root._chunk_cache_handles[self._h5path] = h5py.Dataset(dsid)
+
     def _lookup_dimensions(self):
         attrs = self._h5ds.attrs
         # coordinate variable and dimension, eg. 1D ("time") or 2D string variable
@@ -400,9 +564,7 @@ class BaseVariable(BaseObject):
             "_Netcdf4Coordinates" in attrs
             and attrs.get("CLASS", None) == b"DIMENSION_SCALE"
         ):
-            order_dim = {
-                value._dimid: key for key, value in self._parent._all_dimensions.items()
-            }
+            order_dim = self._parent._all_dimids
             return tuple(
                 order_dim[coord_id] for coord_id in attrs["_Netcdf4Coordinates"]
             )
@@ -441,14 +603,12 @@ class BaseVariable(BaseObject):
                     # get current dimension
                     dimsize = self._h5ds.shape[axis]
                     # get dimension names
-                    dim_names = [
-                        d.name
-                        # for phony dims we need to look only in the current group
-                        for d in self._parent._all_dimensions.maps[0].values()
-                        if d.size == dimsize
-                    ]
+                    # for phony dims we need to look only in the current group
+                    dim_names = self._parent._dimensions._names_by_size().get(
+                        dimsize, []
+                    )
                     # extract wanted dimension name
-                    name = dim_names[phony_dims[dimsize]].split("/")[-1]
+                    name = dim_names[phony_dims[dimsize]]
                     phony_dims[dimsize] += 1
             dims.append(name)
         return tuple(dims)
@@ -492,6 +652,8 @@ class BaseVariable(BaseObject):
         """
         new_shape = ()
         v = np.asarray(value)
+        # logical shape, the extent may be over-allocated
+        h5ds_shape = self._root._grown.get(self._h5path, self._h5ds.shape)
         for i, dim in enumerate(self.dimensions):
             # is unlimited dimensions (check in all dimensions)
             if self._parent._all_dimensions[dim].isunlimited():
@@ -502,7 +664,7 @@ class BaseVariable(BaseObject):
                     if v is None:
                         v = np.asarray(value)
                     if v.ndim == self.ndim:
-                        new_max = max(v.shape[i], self._h5ds.shape[i])
+                        new_max = max(v.shape[i], h5ds_shape[i])
                     elif v.ndim == 0:
                         # for scalar values we take the current dimension size
                         # (check in all dimensions)
@@ -517,7 +679,7 @@ class BaseVariable(BaseObject):
                 elif key[i].stop < 0:
                     new_max = v.shape[i] - key[i].stop
                 else:
-                    new_max = max(key[i].stop, self._h5ds.shape[i])
+                    new_max = max(key[i].stop, h5ds_shape[i])
                 # resize unlimited dimension if needed but no other variables
                 # this is in line with `netcdf4-python` which only resizes
                 # the dimension and this variable
@@ -529,8 +691,8 @@ class BaseVariable(BaseObject):
                 new_shape += (self._parent._all_dimensions[dim].size,)
 
         # increase variable size if shape is changing
-        if self._h5ds.shape != new_shape:
-            self._h5ds.resize(new_shape)
+        if h5ds_shape != new_shape:
+            self._root._resize_extent(self._h5ds, self._h5path, new_shape)
 
     def _add_fillvalue(self, fillvalue):
         """Add _FillValue attribute.
@@ -632,6 +794,34 @@ class BaseVariable(BaseObject):
 
         return self.dtype
 
+    def _logical_key(self, key, shape):
+        """Resolve ``key`` against ``shape`` on over-allocated axes.
+
+        Open slices and negative indices then refer to the logical size
+        instead of the HDF5 extent, indices beyond it raise an IndexError
+        (index arrays are checked by ``_expand_key``).
+        """
+        expanded = _expand_key(key, shape)
+        if expanded is None:
+            raise IndexError(
+                f"unsupported index {key!r} for variable {self.name!r} with "
+                "over-allocated extent"
+            )
+        extent = self._h5ds.shape
+        resolved = []
+        for k, size, current in zip(expanded, shape, extent):
+            if current > size:
+                if isinstance(k, slice):
+                    k = slice(*k.indices(size))
+                elif isinstance(k, (int, np.integer)):
+                    if not -size <= k < size:
+                        raise IndexError(
+                            f"index {k} is out of bounds for dimension of size {size}"
+                        )
+                    k = k + size if k < 0 else k
+            resolved.append(k)
+        return tuple(resolved)
+
     def _get_padding(self, key):
         """Return padding if needed, defaults to False."""
         padding = False
@@ -681,6 +871,9 @@ class BaseVariable(BaseObject):
         return padding
 
     def __array__(self, *args, **kwargs):
+        if self._h5path in self._root._grown:
+            # the extent is over-allocated, read the logical shape
+            return np.asarray(self[...], *args, **kwargs)
         return self._h5ds.__array__(*args, **kwargs)
 
     def __getitem__(self, key):
@@ -696,9 +889,14 @@ class BaseVariable(BaseObject):
                 if version.parse("3.0.0") <= h5py_version < version.parse("3.7.0"):
                     key = _transform_1d_boolean_indexers(key)
 
-        if getattr(self._root, "decode_vlen_strings", False):
+        if self._h5path in self._root._grown:
+            key = self._logical_key(key, self.shape)
+
+        if decode := getattr(self._root, "decode_vlen_strings", False):
             string_info = self._root._h5py.check_string_dtype(self._h5ds.dtype)
             if string_info and string_info.length is None:
+                if decode == "StringDType":
+                    return self._read_stringdtype(key, string_info.encoding)
                 if self._backend == "pyfive":
                     # pyfive backend has already dealt with strings
                     return self._h5ds[key]
@@ -720,13 +918,603 @@ class BaseVariable(BaseObject):
         else:
             h5ds = self._h5ds
 
+        data = None
+        if padding:
+            # numpy combines index arrays pointwise, index like the backends
+            data = outer_index(h5ds, key)
+        elif self._root._memmaps is not None:
+            if (memmap := self._cached_memmap()) is not None:
+                # orthogonal indexing like the backends, views for basic keys
+                data = outer_index(memmap, key)
+        if data is None and not padding and self._backend == "pyfive":
+            if self._root._executor:
+                data = read_chunks_pyfive(h5ds, key, self._root._executor)
+        if data is None and not padding and self._backend == "h5py":
+            data = read_coalesced(h5ds, key)
+        if data is None:
+            data = h5ds[key]
+
         if (
             isinstance(self.datatype, CompoundType)
             and (view := self.datatype.dtype_view) is not None
         ):
-            return h5ds[key].view(view)
+            return data.view(view)
+        else:
+            return data
+
+    def _read_stringdtype(self, key, encoding):
+        """Read variable length strings as numpy StringDType array."""
+        dtype = np.dtypes.StringDType()
+        if self._backend == "h5py":
+            try:
+                return self._h5ds.astype(dtype)[key]
+            except TypeError:
+                # h5py without StringDType support
+                pass
+        data = np.asarray(self._h5ds[key])
+        if data.dtype.kind == "O" and data.size and isinstance(data.flat[0], bytes):
+            # null terminated strings, nothing is lost in fixed width
+            data = data.astype("S")
+        if data.dtype.kind == "S":
+            # decode all elements at once
+            data = np.strings.decode(data, encoding)
+        data = data.astype(dtype, copy=False)
+        return data[()] if data.ndim == 0 else data
+
+    @property
+    def lazy(self):
+        """Lazily indexed view of the variable.
+
+        Selections of the view are composed without reading data, the
+        result is read with a single selection when converted to an array.
+        See :class:`h5netcdf.lazy.LazyArray`.
+
+        Examples
+        --------
+        >>> view = var.lazy[:, 100:200, 300:400][::3]
+        >>> data = view[:, [0, 5, 17]].values
+        """
+        return LazyArray(self)
+
+    def read(self, key=Ellipsis, decode_cf=False, out_dtype=None, out=None):
+        """Read data, optionally decoding CF mask and scale attributes.
+
+        With ``decode_cf=True`` values matching ``_FillValue`` or
+        ``missing_value`` or outside of ``valid_min``/``valid_max``/``valid_range``
+        are set to NaN, and ``scale_factor`` and ``add_offset`` are applied.
+        The attributes are read once and cached. The data is read and decoded
+        slab by slab in a single pass, without full size temporary arrays.
+
+        Parameters
+        ----------
+        key : index expression, optional
+            Defaults to the whole variable.
+        decode_cf : bool, optional
+            Apply CF mask and scale decoding. Defaults to False.
+        out_dtype : numpy.dtype, optional
+            Dtype of the result. Defaults to the dtype of ``scale_factor`` and
+            ``add_offset`` for packed data and to a floating point dtype for
+            masked integer data.
+        out : numpy.ndarray, optional
+            Preallocated C-contiguous destination matching the shape of the
+            selection.
+
+        Returns
+        -------
+        data : numpy.ndarray
+        """
+        if out is not None and out_dtype is not None and out.dtype != out_dtype:
+            raise TypeError(
+                f"dtype of out {out.dtype} does not match out_dtype {np.dtype(out_dtype)}"
+            )
+        dtype = self.dtype
+        if not decode_cf or dtype is str or dtype.kind not in "iuf":
+            data = self[key]
+            if out_dtype is not None:
+                data = np.asarray(data, dtype=out_dtype)
+            if out is None:
+                return data
+            out[...] = data
+            return out
+        return self._read_cf(key, out_dtype=out_dtype, out=out)
+
+    def _read_cf(
+        self, key, out_dtype=None, out=None, mask=True, scale=True, masked=False
+    ):
+        """Read ``key`` and decode it according to the CF attributes.
+
+        Returns a masked array with ``masked=True``, otherwise masked
+        values are set to NaN.
+        """
+        params = self._cf_params
+        dtype = self.dtype
+        if out is not None:
+            out_dtype = out.dtype
+        elif out_dtype is None:
+            out_dtype = decoded_dtype(params, dtype, mask, scale, masked)
+
+        try:
+            selection, squeeze = _basic_selection(key, self.shape)
+        except (TypeError, ValueError):
+            # fancy indexing, decode the selection as a whole
+            raw = np.asarray(BaseVariable.__getitem__(self, key), order="C")
+            selection = [(0, n, 1) for n in raw.shape]
+            squeeze = (False,) * raw.ndim
         else:
-            return h5ds[key]
+            raw = None
+
+        counts = [len(range(*sel)) for sel in selection]
+        out_shape = tuple(c for c, s in zip(counts, squeeze) if not s)
+        if out is None:
+            out = np.empty(out_shape, dtype=out_dtype)
+        elif out.shape != out_shape:
+            raise ValueError(
+                f"shape of out {out.shape} does not match selection shape {out_shape}"
+            )
+        if not (out.flags.c_contiguous and out.flags.writeable):
+            raise ValueError("out needs to be a writeable C-contiguous array")
+        out_mask = np.zeros(out_shape, dtype=bool) if masked else None
+
+        if raw is not None:
+            decode_into(raw, out, params, mask, scale, out_mask)
+        elif self.ndim == 0:
+            raw = np.asarray(BaseVariable.__getitem__(self, key), order="C")
+            decode_into(raw, out, params, mask, scale, out_mask)
+        elif out.size:
+            # read slabs along the first axis, aligned to the chunks
+            dest = out.reshape(counts)
+            dest_mask = None if out_mask is None else out_mask.reshape(counts)
+            start, stop, step = selection[0]
+            chunks = self._h5ds.chunks
+            unit = chunks[0] if chunks else 1
+            row_nbytes = dtype.itemsize * int(np.prod(counts[1:]))
+            rows = unit * max(1, SLAB_NBYTES // max(unit * row_nbytes, 1))
+            buffer = np.empty((min(counts[0], rows // step + 1), *counts[1:]), dtype)
+            rest = tuple(slice(*sel) for sel in selection[1:])
+            i = 0
+            while i < counts[0]:
+                pos = start + i * step
+                boundary = min((pos // rows + 1) * rows, stop)
+                n = min(len(range(pos, boundary, step)), buffer.shape[0])
+                raw = buffer[:n]
+                self.read_into(
+                    raw, (slice(pos, pos + (n - 1) * step + 1, step),) + rest
+                )
+                decode_into(
+                    raw,
+                    dest[i : i + n],
+                    params,
+                    mask,
+                    scale,
+                    None if dest_mask is None else dest_mask[i : i + n],
+                )
+                i += n
+
+        if masked:
+            out = np.ma.MaskedArray(out, mask=out_mask)
+        return out[()] if out.ndim == 0 else out
+
+    def read_into(self, out, key=Ellipsis):
+        """Read data directly into a caller-provided array or buffer.
+
+        In contrast to indexing, no new array is allocated. Parts of the
+        selection which are beyond the extent of the underlying HDF5 dataset
+        are filled with the fillvalue in place.
+
+        Parameters
+        ----------
+        out : numpy.ndarray or buffer
+            Writeable, C-contiguous destination. NumPy arrays need to match
+            shape and dtype of the selection. Other objects implementing the
+            buffer protocol (eg. ``multiprocessing.shared_memory.SharedMemory.buf``)
+            are interpreted with the variable dtype and need to be at least as
+            large as the selection.
+        key : index expression, optional
+            Basic selection (integers, slices and Ellipsis). Defaults to the
+            whole variable.
+
+        Returns
+        -------
+        out : numpy.ndarray
+            The destination, as view on the buffer if a buffer was given.
+        """
+        dtype = self.dtype
+        if dtype is str or dtype.kind == "O":
+            raise TypeError(
+                f"read_into does not support variable length data of variable {self.name!r}"
+            )
+        # target dtype for compound types which carry char arrays
+        if (
+            isinstance(self.datatype, CompoundType)
+            and (view := self.datatype.dtype_view) is not None
+        ):
+            out_dtype = view
+        else:
+            out_dtype = dtype
+
+        selection, squeeze = _basic_selection(key, self.shape)
+        counts = [len(range(*sel)) for sel in selection]
+        out_shape = tuple(c for c, s in zip(counts, squeeze) if not s)
+
+        if not isinstance(out, np.ndarray):
+            out = np.frombuffer(out, dtype=out_dtype, count=int(np.prod(out_shape)))
+            out = out.reshape(out_shape)
+        if out.shape != out_shape:
+            raise ValueError(
+                f"shape of out {out.shape} does not match selection shape {out_shape}"
+            )
+        if out.dtype != out_dtype:
+            raise TypeError(
+                f"dtype of out {out.dtype} does not match variable dtype {out_dtype}"
+            )
+        if not (out.flags.c_contiguous and out.flags.writeable):
+            raise ValueError("out needs to be a writeable C-contiguous array")
+
+        # full dimensional view, use raw dtype to read compound types
+        dest = out.reshape(counts).view(dtype)
+
+        # restrict selection to extent of the hdf5 dataset
+        h5ds = self._h5ds
+        source_sel = []
+        dest_sel = []
+        for (start, stop, step), h5size in zip(selection, h5ds.shape):
+            count = len(range(start, min(stop, h5size), step))
+            source_sel.append(slice(start, start + max(count - 1, 0) * step + 1, step))
+            dest_sel.append(slice(0, count))
+        source_sel = tuple(source_sel)
+        dest_sel = tuple(dest_sel)
+
+        if all(s.stop for s in dest_sel):
+            if self._backend == "h5py":
+                h5ds.read_direct(dest, source_sel=source_sel, dest_sel=dest_sel)
+            else:
+                dest[dest_sel] = h5ds[source_sel]
+
+        # apply padding with fillvalue in place
+        fillvalue = None
+        for axis, (sel, count) in enumerate(zip(dest_sel, counts)):
+            if sel.stop < count:
+                if fillvalue is None:
+                    fillvalue = np.asarray(h5ds.fillvalue, dtype=dtype)
+                dest[(slice(None),) * axis + (slice(sel.stop, None),)] = fillvalue
+        return out
+
+    def iter_along(self, dim, prefetch=2, max_bytes=None):
+        """Iterate over the steps of dimension ``dim`` with read-ahead.
+
+        The variable is read in slabs aligned to the chunks along ``dim``.
+        While the caller processes the steps of one slab, the next
+        ``prefetch`` slabs are read in a background thread, overlapping I/O
+        (and decompression) with compute.
+
+        Parameters
+        ----------
+        dim : str or int
+            Name or axis of the dimension to iterate over.
+        prefetch : int
+            Number of slabs read ahead in a background thread. Defaults to 2.
+            Only the h5py backend reads ahead, the other backends read each
+            slab when it is needed.
+        max_bytes : int, optional
+            Bound of the memory held by the current and the prefetched slabs.
+            Slabs are shrunk (to a divisor of the chunk size) to stay below.
+            Defaults to 64 MiB.
+
+        Yields
+        ------
+        data : numpy.ndarray
+            The data of one step, equal to ``var[..., t, ...]`` (the data of
+            a slab is shared between its steps).
+
+        Examples
+        --------
+        >>> for frame in var.iter_along("time", prefetch=4):
+        ...     render(frame)
+        """
+        if isinstance(dim, str):
+            if dim not in self.dimensions:
+                raise ValueError(
+                    f"variable {self.name!r} has no dimension {dim!r}, "
+                    f"dimensions are {self.dimensions}"
+                )
+            axis = self.dimensions.index(dim)
+        else:
+            axis = int(dim)
+            if not -self.ndim <= axis < self.ndim:
+                raise ValueError(
+                    f"axis {dim} is out of bounds for variable {self.name!r} "
+                    f"with {self.ndim} dimensions"
+                )
+            axis %= self.ndim
+        if prefetch < 1:
+            raise ValueError(f"prefetch needs to be a positive integer, got {prefetch}")
+        if max_bytes is None:
+            max_bytes = _ITER_MAX_BYTES
+        return self._iter_along(axis, prefetch, max_bytes)
+
+    def _iter_along(self, axis, prefetch, max_bytes):
+        shape = self.shape
+        size = shape[axis]
+        dtype = self.dtype
+        itemsize = np.dtype(object if dtype is str else dtype).itemsize
+        step_nbytes = max(itemsize * int(np.prod(shape[:axis] + shape[axis + 1 :])), 1)
+        # current slab plus the prefetched ones
+        budget = max(max_bytes // ((prefetch + 1) * step_nbytes), 1)
+        chunks = self._h5ds.chunks
+        if chunks is None:
+            length = budget
+        else:
+            length = chunks[axis]
+            while length > budget or chunks[axis] % length:
+                length -= 1
+
+        def read(start):
+            key = (slice(None),) * axis + (slice(start, min(start + length, size)),)
+            return self[key]
+
+        if self._backend != "h5py":
+            # pyfive and h5pyd files can not be read concurrently from
+            # another thread, read synchronously
+            for start in range(0, size, length):
+                slab = read(start)
+                for i in range(slab.shape[axis]):
+                    yield slab[(slice(None),) * axis + (i,)]
+            return
+
+        starts = iter(range(0, size, length))
+        pending = deque()
+        executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="h5netcdf-prefetch"
+        )
+        try:
+            for start in itertools.islice(starts, prefetch):
+                pending.append(executor.submit(read, start))
+            while pending:
+                slab = pending.popleft().result()
+                start = next(starts, None)
+                if start is not None:
+                    pending.append(executor.submit(read, start))
+                for i in range(slab.shape[axis]):
+                    yield slab[(slice(None),) * axis + (i,)]
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _check_stats_index(self, h5ds):
+        if self._root._format == "NETCDF4_CLASSIC":
+            raise ValueError(
+                "chunk statistics are not supported in NETCDF4_CLASSIC format"
+            )
+        if h5ds.chunks is None or not h5ds.shape:
+            raise ValueError(
+                f"chunk statistics need a chunked variable, {self.name!r} is not chunked"
+            )
+        if h5ds.dtype.kind not in "iuf":
+            raise TypeError(
+                f"chunk statistics are only supported for numeric variables, "
+                f"got dtype {h5ds.dtype}"
+            )
+
+    def build_stats_index(self):
+        """Compute and store per-chunk minimum, maximum and count of valid values.
+
+        The statistics are stored in a hidden dataset next to the variable,
+        which netCDF-C does not read, and are kept up to date by subsequent
+        writes through h5netcdf. Values equal to ``_FillValue`` and NaN are
+        not counted. Not supported in NETCDF4_CLASSIC format. See
+        :meth:`where_chunks`.
+        """
+        h5ds = self._h5ds
+        self._check_stats_index(h5ds)
+        self._update_stats(h5ds)
+
+    def _stats_h5ds(self, h5ds):
+        if h5ds.chunks is None:
+            return None
+        return find_stats(self._parent._h5group, self._h5path.rsplit("/", 1)[-1])
+
+    def _update_stats(self, h5ds, lo=None, hi=None):
+        h5py = self._root._h5py
+        update_stats(
+            self._parent._h5group,
+            self._h5path.rsplit("/", 1)[-1],
+            h5ds,
+            h5py.special_dtype(ref=h5py.Reference),
+            self.attrs.get("_FillValue"),
+            lo,
+            hi,
+        )
+
+    @property
+    def chunk_stats(self):
+        """Per-chunk statistics as dict of ``min``, ``max`` and ``count`` arrays.
+
+        The arrays are shaped like the grid of chunks, None if no statistics
+        index was built.
+        """
+        h5ds = self._h5ds
+        if (stats := self._stats_h5ds(h5ds)) is None:
+            return None
+        return dict(zip(("min", "max", "count"), load_stats(h5ds, stats)))
+
+    def where_chunks(self, predicate):
+        """Return the chunks which may contain values matching ``predicate``.
+
+        Parameters
+        ----------
+        predicate : callable
+            Called as ``predicate(min, max)`` with arrays of the per-chunk
+            minimum and maximum of all chunks containing valid values, needs
+            to return a boolean array. Chunks for which it returns False are
+            skipped.
+
+        Returns
+        -------
+        chunks : list of tuple of slice
+            Selections of the matching chunks, which can be used for indexing.
+
+        Examples
+        --------
+        >>> for sel in var.where_chunks(lambda mn, mx: mx > 50):
+        ...     data = var[sel]
+        """
+        h5ds = self._h5ds
+        if (stats := self._stats_h5ds(h5ds)) is None:
+            raise ValueError(
+                f"variable {self.name!r} has no chunk statistics, "
+                "call build_stats_index first"
+            )
+        return matching_chunks(h5ds, stats, predicate)
+
+    def _update_stats_index(self, key):
+        """Update the chunk statistics of the chunks touched by writing ``key``."""
+        h5ds = self._h5ds
+        chunks = h5ds.chunks
+        try:
+            selection, _ = _basic_selection(key, h5ds.shape)
+        except (TypeError, ValueError, IndexError):
+            # fancy indexing, update all chunks
+            lo, hi = None, None
+        else:
+            if any(start >= stop for start, stop, _ in selection):
+                return
+            lo = tuple(start // c for (start, _, _), c in zip(selection, chunks))
+            hi = tuple(
+                (start + (len(range(start, stop, step)) - 1) * step) // c + 1
+                for (start, stop, step), c in zip(selection, chunks)
+            )
+        self._update_stats(h5ds, lo, hi)
+
+    def chunk_index(self):
+        """Return the location of all stored chunks in the file.
+
+        Locations are collected in bulk (with ``chunk_iter`` for h5py).
+        Chunks which were never written are not included. Contiguous
+        variables are reported as a single chunk spanning the variable.
+
+        Returns
+        -------
+        index : dict
+            ``chunk`` (grid coordinates, shape ``(nchunks, ndim)``),
+            ``offset`` (byte offsets in the file), ``size`` (stored sizes in
+            bytes) and ``filter_mask`` (filters skipped per chunk) arrays.
+
+        Raises
+        ------
+        ValueError
+            If the storage of the variable has no location in the file
+            (compact, virtual or remote datasets).
+        """
+        h5ds = self._h5ds
+        if self._backend == "h5py":
+            entries = _h5py_chunk_entries(h5ds)
+        elif self._backend == "pyfive":
+            entries = _pyfive_chunk_entries(h5ds)
+        else:
+            raise ValueError(
+                f"chunk locations are not available with the {self._backend!r} backend"
+            )
+        ndim = len(h5ds.shape)
+        chunks = h5ds.chunks or tuple(max(s, 1) for s in h5ds.shape)
+        offsets = np.array([e[0] for e in entries], dtype=np.int64).reshape(-1, ndim)
+        return {
+            "chunk": offsets // np.array(chunks, dtype=np.int64),
+            "offset": np.array([e[1] for e in entries], dtype=np.uint64),
+            "size": np.array([e[2] for e in entries], dtype=np.uint64),
+            "filter_mask": np.array([e[3] for e in entries], dtype=np.uint32),
+        }
+
+    def _memmap_location(self, h5ds):
+        """Return filename and byte offset of the raw data of ``h5ds``.
+
+        Raises ValueError if the data can not be memory mapped.
+        """
+        dtype = h5ds.dtype
+        if dtype.kind == "O" or dtype.hasobject or dtype.metadata:
+            raise ValueError("variable length data can not be memory mapped")
+        if self._backend == "h5py":
+            if self._root._h5file.driver != "sec2":
+                raise ValueError(
+                    f"file opened with driver {self._root._h5file.driver!r} "
+                    "can not be memory mapped"
+                )
+            dcpl = h5ds.id.get_create_plist()
+            if dcpl.get_layout() != self._root._h5py.h5d.CONTIGUOUS:
+                raise ValueError("only contiguous variables can be memory mapped")
+            if dcpl.get_nfilters() or dcpl.get_external_count():
+                raise ValueError("filtered variables can not be memory mapped")
+            # make sure data written through HDF5 is visible in the mapping
+            if self._root._writable:
+                self._root._h5file.flush()
+            offset = h5ds.id.get_offset()
+            filename = self._root._h5file.filename
+        elif self._backend == "pyfive":
+            from pyfive.core import UNDEFINED_ADDRESS
+
+            dsid = h5ds.id
+            if dsid.layout_class != 1:
+                raise ValueError("only contiguous variables can be memory mapped")
+            if dsid.filter_pipeline is not None:
+                raise ValueError("filtered variables can not be memory mapped")
+            if not dsid.posix:
+                raise ValueError("file objects can not be memory mapped")
+            offset = dsid.data_offset
+            if offset == UNDEFINED_ADDRESS:
+                offset = None
+            filename = dsid._filename
+        else:
+            raise ValueError(f"backend {self._backend!r} does not support memmap")
+        if offset is None:
+            raise ValueError("storage of variable is not allocated")
+        return filename, offset
+
+    def as_memmap(self):
+        """Return a read-only memory mapped view on the variable data.
+
+        Only contiguous, unfiltered variables of files on disk can be
+        mapped. No data is copied, the operating system pages data in on
+        access and shares it between processes via the page cache.
+
+        Returns
+        -------
+        data : numpy.memmap
+
+        Raises
+        ------
+        ValueError
+            If the variable can not be memory mapped.
+        """
+        data = self._open_memmap(self._h5ds)
+        if (
+            isinstance(self.datatype, CompoundType)
+            and (view := self.datatype.dtype_view) is not None
+        ):
+            return data.view(view)
+        return data
+
+    def _open_memmap(self, h5ds):
+        if h5ds.shape != self.shape:
+            raise ValueError(
+                f"variable {self.name!r} is shorter than its dimensions "
+                "and would need padding"
+            )
+        if h5ds.size == 0:
+            raise ValueError("empty variables can not be memory mapped")
+        filename, offset = self._memmap_location(h5ds)
+        return np.memmap(
+            filename, dtype=h5ds.dtype, mode="r", offset=offset, shape=h5ds.shape
+        )
+
+    def _cached_memmap(self):
+        """Return the memmap used by the memmap read mode, None if not possible."""
+        memmaps = self._root._memmaps
+        if self._h5path not in memmaps:
+            try:
+                memmaps[self._h5path] = self._open_memmap(self._h5ds)
+            except ValueError:
+                memmaps[self._h5path] = None
+        return memmaps[self._h5path]
 
     def __setitem__(self, key, value):
         from .legacyapi import Dataset
@@ -747,6 +1535,8 @@ class BaseVariable(BaseObject):
             key = _transform_1d_boolean_indexers(key)
             # resize on write only for legacy API
             self._maybe_resize_dimensions(key, value)
+            if self._h5path in self._root._grown:
+                key = self._logical_key(key, self._root._grown[self._h5path])
 
         if (
             isinstance(self.datatype, CompoundType)
@@ -765,9 +1555,34 @@ class BaseVariable(BaseObject):
                 self._h5ds.id.write(
                     h5py.h5s.ALL, h5py.h5s.ALL, value, mtype=self._h5ds.id.get_type()
                 )
-            else:
+            elif not self._write_chunks_parallel(key, value):
                 self._h5ds[key] = value
 
+        if self._stats_h5ds(self._h5ds) is not None:
+            self._update_stats_index(key)
+
+    def _write_chunks_parallel(self, key, value):
+        """Encode and write chunks in the thread pool of the file if enabled.
+
+        Returns False if the write has to go through the backend.
+        """
+        executor = self._root._executor
+        if executor is None or self._backend != "h5py":
+            return False
+        h5ds = self._h5ds
+        try:
+            selection, squeeze = _basic_selection(key, h5ds.shape)
+        except (TypeError, ValueError, IndexError):
+            return False
+        return write_chunks_h5py(
+            h5ds,
+            selection,
+            squeeze,
+            value,
+            executor,
+            max_pending=2 * self._root._chunk_workers,
+        )
+
     @property
     def attrs(self):
         """Return variable attributes."""
@@ -776,18 +1591,33 @@ class BaseVariable(BaseObject):
             self._root._check_valid_netcdf_dtype,
             self._root._h5py,
             format=self._root._format,
+            on_change=self._clear_cf_cache,
         )
 
+    def _clear_cf_cache(self):
+        self._cf_cache = None
+
+    @property
+    def _cf_params(self):
+        """CF decoding parameters, read from the attributes on first use."""
+        if self._cf_cache is None:
+            self._cf_cache = cf_params(self.attrs)
+        return self._cf_cache
+
     _cls_name = "h5netcdf.Variable"
 
     def __repr__(self):
         if self._parent._root._closed:
             return f"<Closed {self._cls_name}>"
         header = f"<{self._cls_name} {self.name!r}: dimensions {self.dimensions}, shape {self.shape}, dtype {self.dtype}>"
+        attrs = self.attrs
         return "\n".join(
             [header]
-            + ["Attributes:"]
-            + [f"    {k}: {v!r}" for k, v in self.attrs.items()]
+            + _repr_section(
+                "Attributes",
+                len(attrs),
+                [f"{k}: {v!r}" for k, v in _first(attrs.items(), self._root)],
+            )
         )
 
 
@@ -928,6 +1758,50 @@ def _unlabeled_dimension_mix(h5py_dataset):
     return status
 
 
+def _scan_phony_dims(root, h5group):
+    """Count the labeled and unlabeled dimensions of the datasets of ``h5group``.
+
+    Returns the count of labeled dimensions by maximum size (None for
+    unlimited), the maximum count of unlabeled axes of any dataset by size and
+    the names of the child groups.
+    """
+    labeled_dims = Counter()
+    phony_dims = Counter()
+    children = []
+    for k in h5group:
+        if k.startswith(STATS_PREFIX):
+            continue
+        try:
+            v = h5group[k]
+        except NotImplementedError:
+            # unsupported by pyfive, handled when the group is created
+            continue
+        if v is None:
+            continue
+        if isinstance(v, root._h5py.Group):
+            children.append(k)
+        elif isinstance(v, root._h5py.Datatype):
+            continue
+        elif v.attrs.get("CLASS") == b"DIMENSION_SCALE":
+            labeled_dims[None if v.maxshape == (None,) else v.shape[0]] += 1
+        elif _unlabeled_dimension_mix(v) == "unlabeled":
+            phony_dims |= Counter(v.shape)
+    return labeled_dims, phony_dims, children
+
+
+def _missing_phony_sizes(phony_dims, labeled_dims):
+    """Return the sizes of the phony dimensions to create, in order.
+
+    Unlabeled axes only need phony dimensions if there are not enough
+    labeled dimensions of that size.
+    """
+    return [
+        size
+        for size, count in phony_dims.items()
+        for _ in range(labeled_dims[size], count)
+    ]
+
+
 def _check_dtype(group, dtype):
     """Check and handle dtypes when adding variable to given group.
 
@@ -1128,6 +2002,9 @@ class Group(Mapping):
             phony_dims = Counter()
 
         for k in self._h5group:
+            if k.startswith(STATS_PREFIX):
+                # chunk statistics of a variable
+                continue
             if self._root._backend == "pyfive":
                 # Some backends might have unsupported HDF5
                 # features. Either skip over them, or fail.
@@ -1185,15 +2062,19 @@ class Group(Mapping):
             labeled_dims = Counter(
                 [d._maxsize for d in self._dimensions.values() if not d._phony]
             )
-            for size, cnt in phony_dims.items():
-                # only create missing dimensions
-                for pcnt in range(labeled_dims[size], cnt):
+            # for sort mode, names are precalculated for all groups
+            sorted_names = iter(self._root._sorted_phony_names.get(self._h5path, ()))
+            for size in _missing_phony_sizes(phony_dims, labeled_dims):
+                name = next(sorted_names, None)
+                if name is None:
                     name = self._root._phony_dim_count
-                    # for sort mode, we need to add precalculated max_dim_id + 1
                     if self._root._phony_dims_mode == "sort":
                         name += self._root._max_dim_id + 1
                     name = f"phony_dim_{name}"
-                    self._dimensions.add_phony(name, size)
+                self._dimensions.add_phony(name, size)
+            if phony_dims:
+                # index the dimensions by size for the lookup of phony dimensions
+                self._dimensions._names_by_size()
 
         self._initialized = True
 
@@ -1256,6 +2137,11 @@ class Group(Mapping):
                 )
         self._dimensions.update(value)
 
+    @property
+    def _all_dimids(self):
+        """Mapping of the ids of all visible dimensions to their names."""
+        return ChainMap(*(dims._dimid_index() for dims in self._all_dimensions.maps))
+
     def _create_child_group(self, name):
         if name in self:
             raise ValueError(f"unable to create group {name!r} (name already exists)")
@@ -1298,8 +2184,11 @@ class Group(Mapping):
         fillvalue,
         chunks,
         chunking_heuristic,
-        **kwargs,
+        kwargs,
+        virtual_layout=None,
     ):
+        # ``kwargs`` are the backend keyword arguments of ``create_variable``,
+        # passed as dict so that they can not set ``virtual_layout``
         if name in self:
             raise ValueError(
                 f"unable to create variable {name!r} (name already exists)"
@@ -1313,6 +2202,21 @@ class Group(Mapping):
         # check and handle dtypes
         dtype = _check_dtype(self, dtype)
 
+        chunk_cache = kwargs.pop("chunk_cache", None)
+        if chunk_cache is not None:
+            chunk_cache = _check_chunk_cache(chunk_cache)
+            if self._root._backend != "h5py":
+                raise ValueError(
+                    f"chunk_cache is only supported by the 'h5py' backend, got {self._root._backend!r}"
+                )
+
+        chunk_stats = kwargs.pop("chunk_stats", False)
+        if chunk_stats and self._root._format == "NETCDF4_CLASSIC":
+            raise ValueError(
+                "chunk statistics are not supported in NETCDF4_CLASSIC format"
+            )
+        chunk_target_bytes = kwargs.pop("chunk_target_bytes", None)
+
         if "scaleoffset" in kwargs:
             _invalid_netcdf_feature(
                 "scale-offset filters",
@@ -1354,18 +2258,33 @@ class Group(Mapping):
         if shape != maxshape:
             kwargs["maxshape"] = maxshape
 
+        if chunking_heuristic not in _CHUNKING_HEURISTICS:
+            raise ValueError(
+                f"got unrecognized value {chunking_heuristic} for chunking_heuristic argument "
+                f"(has to be one of {', '.join(map(repr, _CHUNKING_HEURISTICS[1:]))})"
+            )
+        if chunk_target_bytes is not None and chunking_heuristic == "h5py":
+            raise ValueError(
+                "chunk_target_bytes is not supported by the 'h5py' heuristic"
+            )
+
         has_unsized_dims = 0 in shape
-        if has_unsized_dims and chunks in {None, True}:
+        if chunks in {None, True} and chunking_heuristic in _ACCESS_PATTERNS:
+            if not shape:
+                raise ValueError("Chunks not allowed for scalar datasets.")
+            # the time axis is the (first) unlimited dimension, if any
+            unlimited = [i for i, size in enumerate(maxshape) if size is None]
+            chunks = _get_access_chunksizes(
+                shape,
+                dtype,
+                chunking_heuristic,
+                time_axis=unlimited[0] if unlimited else None,
+                target_bytes=chunk_target_bytes or _ACCESS_CHUNK_BYTES,
+            )
+        elif has_unsized_dims and chunks in {None, True}:
             if chunking_heuristic in [None, "h5netcdf"]:
-                chunks = _get_default_chunksizes(shape, dtype)
-            elif chunking_heuristic == "h5py":
-                # do nothing -> h5py will handle chunks internally
-                pass
-            else:
-                raise ValueError(
-                    f"got unrecognized value {chunking_heuristic} for chunking_heuristic argument "
-                    '(has to be "h5py" or "h5netcdf")'
-                )
+                chunks = _get_default_chunksizes(shape, dtype, chunk_target_bytes)
+            # for "h5py" do nothing -> h5py will handle chunks internally
 
         # Clear dummy HDF5 datasets with this name that were created for a
         # dimension scale without a corresponding variable.
@@ -1385,7 +2304,11 @@ class Group(Mapping):
 
         # create hdf5 variable
         # for classic format string types write with low level API
-        if (
+        if virtual_layout is not None:
+            self._h5group.create_virtual_dataset(
+                h5name, virtual_layout, fillvalue=h5fillvalue
+            )
+        elif (
             self._root._format == "NETCDF4_CLASSIC"
             and np.dtype(dtype).kind in ["S", "U"]
             and self._root._h5py.__name__ == "h5py"
@@ -1442,8 +2365,23 @@ class Group(Mapping):
         if fillvalue is not None:
             variable._add_fillvalue(fillvalue)
 
+        if chunk_cache is not None:
+            variable.set_chunk_cache(**chunk_cache)
+
+        if chunk_stats:
+            variable.build_stats_index()
+
         return variable
 
+    def _create_virtual_variable(self, name, dimensions, dtype, layout, fillvalue):
+        """Create a variable mapped by the ``h5py.VirtualLayout`` ``layout``.
+
+        Used by :func:`h5netcdf.tools.aggregate`.
+        """
+        return self._create_child_variable(
+            name, dimensions, dtype, None, fillvalue, None, None, {}, layout
+        )
+
     def create_variable(
         self,
         name,
@@ -1474,7 +2412,17 @@ class Group(Mapping):
         chunking_heuristic : str, optional
             Specify auto-chunking approach. Can be either of ``h5py`` or ``h5netcdf``. Defaults to
             ``h5netcdf``. Discussion on ``h5netcdf`` chunking can be found in (:issue:`52`)
-            and (:pull:`127`).
+            and (:pull:`127`). The access pattern heuristics ``timeseries`` (long along the
+            time axis, small across the others), ``spatial`` (one time step, large across the
+            others) and ``balanced`` (same fraction of every axis) always chunk the variable.
+            The time axis is the first unlimited dimension. Variables without unlimited
+            dimension are chunked as for ``balanced``.
+        chunk_target_bytes : int, optional
+            Target chunk size in bytes for the ``h5netcdf`` and access pattern heuristics.
+            Defaults to 1 MiB for the access pattern heuristics. The ``h5netcdf`` heuristic
+            only chooses the chunks of variables with unlimited dimensions of size zero, the
+            chunks of other variables (eg. compressed ones) are chosen by h5py and this
+            parameter is ignored.
         compression : str, optional
             Compression filter to apply, defaults to ``gzip``. ``zlib`` is an alias for ``gzip``.
         compression_opts : int
@@ -1484,6 +2432,13 @@ class Group(Mapping):
             If ``True``, HDF5 Fletcher32 checksum algorithm is applied. Defaults to ``False``.
         shuffle : bool, optional
             If ``True``, HDF5 shuffle filter will be applied. Defaults to ``True``.
+        chunk_cache : str or dict, optional
+            Raw data chunk cache of the variable, either ``"auto"`` or a dict of
+            ``nbytes``, ``nslots`` and ``w0``. See :meth:`Variable.set_chunk_cache`.
+        chunk_stats : bool, optional
+            Maintain per-chunk minimum, maximum and count statistics on write.
+            See :meth:`Variable.build_stats_index`. Defaults to ``False``, not
+            supported in NETCDF4_CLASSIC format.
 
         Note
         ----
@@ -1545,7 +2500,7 @@ class Group(Mapping):
             fillvalue,
             chunks,
             chunking_heuristic,
-            **kwargs,
+            kwargs,
         )
 
     def _get_child(self, key):
@@ -1650,36 +2605,67 @@ class Group(Mapping):
 
     _cls_name = "h5netcdf.Group"
 
+    def _repr_sections(self):
+        """Return the sections of the repr as ``(title, count, items)``.
+
+        Only the first ``repr_max_items`` members of each section are
+        formatted, so that the metadata of the others is not loaded.
+        """
+        root = self._root
+        dims = self.dimensions
+        groups = self.groups
+        variables = self.variables
+        attrs = self.attrs
+        return [
+            (
+                "Dimensions",
+                len(dims),
+                [f"{k}: {v}" for k, v in _first(dims.items(), root)],
+            ),
+            ("Groups", len(groups), list(_first(groups, root))),
+            (
+                "Variables",
+                len(variables),
+                [
+                    f"{k}: {v.dimensions!r} {v.dtype}"
+                    for k, v in _first(variables.items(), root)
+                ],
+            ),
+            (
+                "Attributes",
+                len(attrs),
+                [f"{k}: {v!r}" for k, v in _first(attrs.items(), root)],
+            ),
+        ]
+
     def _repr_body(self):
-        return (
-            ["Dimensions:"]
-            + [
-                "    {}: {}".format(
-                    k,
-                    (
-                        f"Unlimited (current: {self._dimensions[k].size})"
-                        if v is None
-                        else v
-                    ),
-                )
-                for k, v in self.dimensions.items()
-            ]
-            + ["Groups:"]
-            + [f"    {g}" for g in self.groups]
-            + ["Variables:"]
-            + [
-                f"    {k}: {v.dimensions!r} {v.dtype}"
-                for k, v in self.variables.items()
-            ]
-            + ["Attributes:"]
-            + [f"    {k}: {v!r}" for k, v in self.attrs.items()]
-        )
+        return [
+            line
+            for section in self._repr_sections()
+            for line in _repr_section(*section)
+        ]
+
+    def _repr_header(self):
+        return f"<{self._cls_name} {self.name!r} ({len(self)} members)>"
 
     def __repr__(self):
         if self._root._closed:
             return f"<Closed {self._cls_name}>"
-        header = f"<{self._cls_name} {self.name!r} ({len(self)} members)>"
-        return "\n".join([header] + self._repr_body())
+        return "\n".join([self._repr_header()] + self._repr_body())
+
+    def _repr_html_(self):
+        if self._root._closed:
+            return f"<pre>{html.escape(repr(self))}</pre>"
+        parts = [f"<div><strong>{html.escape(self._repr_header())}</strong></div>"]
+        for title, count, items in self._repr_sections():
+            entries = [f"<li><code>{html.escape(item)}</code></li>" for item in items]
+            if count > len(items):
+                entries.append(f"<li>... ({count - len(items)} more)</li>")
+            parts.append(
+                f"<details><summary>{title} ({count})</summary>"
+                f"<ul>{''.join(entries)}</ul></details>"
+            )
+        return "\n".join(parts)
 
     def resize_dimension(self, dim, size):
         """Resize a dimension to a certain size.
@@ -1689,6 +2675,42 @@ class Group(Mapping):
         """
         self._dimensions[dim]._resize(size)
 
+    def resize_dimensions(self, sizes):
+        """Resize several dimensions at once.
+
+        In contrast to calling :meth:`resize_dimension` for each dimension,
+        every variable referring to the dimensions is resized only once to
+        its new shape.
+
+        Parameters
+        ----------
+        sizes : dict
+            New sizes of unlimited dimensions of this group by name.
+        """
+        from .legacyapi import Dataset
+
+        dims = {name: self._dimensions[name] for name in sizes}
+        for dim in dims.values():
+            if not dim.isunlimited():
+                raise ValueError(
+                    f"Dimension '{dim.name}' is not unlimited and thus cannot be resized."
+                )
+
+        # new shapes of the referring datasets by object id
+        shapes = {}
+        if not isinstance(self._root, Dataset):
+            # the legacy API resizes variables on write
+            for name, dim in dims.items():
+                for ref, axis in dim._scale_refs:
+                    h5ds = self._all_h5groups[ref]
+                    _, shape = shapes.setdefault(h5ds.id, (h5ds, list(h5ds.shape)))
+                    shape[axis] = sizes[name]
+
+        for name, dim in dims.items():
+            self._root._resize_extent(dim._h5ds, dim._h5path, (sizes[name],))
+        for h5ds, shape in shapes.values():
+            h5ds.resize(tuple(shape))
+
     def create_enumtype(self, datatype, datatype_name, enum_dict):
         """Create EnumType.
 
@@ -1760,7 +2782,12 @@ def _open_pyfive(path, mode):
         return h5file
 
 
-def _open_h5pyd(path, mode, **kwargs):
+def _open_h5pyd(path, mode, session_pool=None, **kwargs):
+    with _use_pool(session_pool):
+        return _open_h5pyd_file(path, mode, **kwargs)
+
+
+def _open_h5pyd_file(path, mode, **kwargs):
     original_mode = mode
     if mode != "r":
         kwargs.setdefault("track_order", _get_track_order("h5pyd"))
@@ -1864,6 +2891,56 @@ class File(Group):
             h5py limiting the number of attributes for a given variable.
             Ignored for the 'pyfive' backend.
 
+        session_pool: h5netcdf.sessions.SessionPool
+            Share keep-alive HTTP sessions between files opened against the
+            same endpoint. Only supported by the 'h5pyd' backend.
+
+        chunk_workers: int
+            Number of threads used to decompress chunks of filtered variables
+            when reading with the 'pyfive' backend, and to compress chunks
+            when writing with the 'h5py' backend (for the shuffle, gzip and
+            fletcher32 filters). Defaults to None (serial).
+
+        memmap: bool
+            Read contiguous, unfiltered variables through read-only memory
+            maps (see :meth:`Variable.as_memmap`). Indexing then returns views
+            without copying where possible. Other variables are read as usual.
+            Only supported in read mode. Defaults to False.
+
+        swmr: bool
+            Single-writer/multiple-reader access to a file which is written
+            while it is read. In mode "r" the file is opened as a SWMR reader,
+            in modes "r+" and "a" SWMR writing is started once the existing
+            file is opened. Writers can then resize and write variables, but
+            not create dimensions, variables or groups, so the file needs to
+            be created beforehand with ``libver="latest"``. Readers call
+            :meth:`refresh` to see new records. Only supported by the 'h5py'
+            backend. Defaults to False.
+
+        growth_policy: None, 'chunks' or 'geometric'
+            How unlimited dimensions are grown when the legacy API resizes
+            them on write. By default the HDF5 extents are resized exactly,
+            a metadata operation for every appended record. 'chunks' rounds
+            the extents up to a multiple of the chunk size, 'geometric' at
+            least doubles them. The netCDF sizes are tracked in memory and
+            the extents are trimmed to them (and written to disk) on every
+            :meth:`flush` (``sync``) and on :meth:`close`. Call ``sync``
+            regularly when appending for a long time, a process ending
+            without it leaves the over-allocated lengths in the file. Only
+            supported by the legacy API.
+
+        repr_max_items: int or None
+            Number of members (dimensions, groups, variables and attributes)
+            listed per section in the repr of groups and variables, the
+            remaining ones are only counted. None lists all members.
+            Defaults to 50.
+
+        chunk_cache: dict
+            Raw data chunk cache per variable, mapping variable paths to
+            either "auto" or a dict of ``nbytes``, ``nslots`` and ``w0``. See
+            :meth:`Variable.set_chunk_cache`. Only supported by the 'h5py'
+            backend.
+
         **kwargs:
             Additional keyword arguments to be passed to the backend
             file constructor, which is ``h5py.File`` for the 'h5py'
@@ -1885,11 +2962,82 @@ class File(Group):
 
         """
         self.decode_vlen_strings = kwargs.pop("decode_vlen_strings", None)
+        session_pool = kwargs.pop("session_pool", None)
+        self._chunk_workers = kwargs.pop("chunk_workers", None)
+        self._chunk_executor = None
+        chunk_cache = kwargs.pop("chunk_cache", None) or {}
+        # chunk cache settings per hdf5 path, applied when first accessed
+        self._chunk_cache = {}
+        # dataset handles opened with a variable specific chunk cache
+        self._chunk_cache_handles = {}
+        self._repr_max_items = kwargs.pop("repr_max_items", _REPR_MAX_ITEMS)
+        self._growth_policy = kwargs.pop("growth_policy", None)
+        # logical shapes of datasets with over-allocated extents, by hdf5 path
+        self._grown = {}
+        self._swmr = kwargs.pop("swmr", False)
+        # hdf5 paths of the datasets with unlimited axes, refreshed by SWMR readers
+        self._swmr_paths = None
+        memmap = kwargs.pop("memmap", False)
+        # memory maps of variables, keyed by hdf5 path (None if not possible)
+        self._memmaps = {} if memmap else None
         self._close_h5file = True
         self._preexisting_file = True
 
         try:
             self._backend = _parse_backend(path, mode, backend, **kwargs)
+            if self._growth_policy not in _GROWTH_POLICIES:
+                raise ValueError(
+                    f"growth_policy needs to be one of {_GROWTH_POLICIES}, "
+                    f"got {self._growth_policy!r}"
+                )
+            from .legacyapi import Dataset
+
+            if self._growth_policy is not None and not isinstance(self, Dataset):
+                raise ValueError(
+                    "growth_policy is only supported by the legacy API, "
+                    "which resizes dimensions on write"
+                )
+            if session_pool is not None and self.backend != "h5pyd":
+                raise ValueError(
+                    f"session_pool is only supported by the 'h5pyd' backend, got {self.backend!r}"
+                )
+            self._chunk_cache = {
+                "/" + name.lstrip("/"): _check_chunk_cache(value)
+                for name, value in chunk_cache.items()
+            }
+            if self._chunk_cache and self.backend != "h5py":
+                raise ValueError(
+                    f"chunk_cache is only supported by the 'h5py' backend, got {self.backend!r}"
+                )
+            if self._swmr:
+                if self.backend != "h5py":
+                    raise ValueError(
+                        f"swmr is only supported by the 'h5py' backend, got {self.backend!r}"
+                    )
+                if mode == "r":
+                    kwargs["swmr"] = True
+                elif mode in ("r+", "a"):
+                    if isinstance(path, (str, os.PathLike)) and not os.path.exists(
+                        path
+                    ):
+                        raise ValueError(
+                            f"swmr writing needs an existing file, {path!r} does not "
+                            "exist. Create the dimensions and variables first "
+                            "(with libver='latest')"
+                        )
+                    # SWMR writing needs the latest file format
+                    kwargs.setdefault("libver", "latest")
+                else:
+                    raise ValueError(
+                        f"swmr=True needs mode 'r' (readers) or 'r+' or 'a' "
+                        f"(writers), got {mode!r}"
+                    )
+            if memmap and mode != "r":
+                raise ValueError("memmap=True is only supported in read mode 'r'")
+            if self._chunk_workers is not None and self._chunk_workers < 1:
+                raise ValueError(
+                    f"chunk_workers needs to be a positive integer, got {self._chunk_workers!r}"
+                )
             if self.backend == "pyfive":
                 self._unsupported_hdf5_features = kwargs.pop(
                     "unsupported_hdf5_features",
@@ -1900,7 +3048,7 @@ class File(Group):
             elif self.backend == "h5pyd":
                 self._h5py = h5pyd
                 self.__h5file, self._preexisting_file = _open_h5pyd(
-                    path, mode, **kwargs
+                    path, mode, session_pool=session_pool, **kwargs
                 )
             else:  # default h5py
                 self._h5py = h5py
@@ -1955,18 +3103,46 @@ class File(Group):
         else:
             if self.decode_vlen_strings is None:
                 self.decode_vlen_strings = False
+            elif self.decode_vlen_strings not in (True, False, "StringDType"):
+                raise ValueError(
+                    "decode_vlen_strings needs to be one of True, False or "
+                    f"'StringDType', got {self.decode_vlen_strings!r}"
+                )
+            elif self.decode_vlen_strings == "StringDType" and not hasattr(
+                getattr(np, "dtypes", None), "StringDType"
+            ):
+                raise ValueError("decode_vlen_strings='StringDType' needs numpy>=2")
 
         self._max_dim_id = -1
         # This maps keeps track of all HDF5 datasets corresponding to this group.
         self._all_h5groups = ChainMap(self._h5group)
+        # name phony dimensions of all groups up front, mimics netcdf-c
+        # style naming while groups are still created lazily
+        self._sorted_phony_names = (
+            self._sort_phony_dimensions() if phony_dims == "sort" else {}
+        )
         super().__init__(self, self._h5path)
         # get maximum dimension id and count of labeled dimensions
         if self._writable:
             self._max_dim_id = self._get_maximum_dimension_id()
-        # initialize all groups to detect/create phony dimensions
-        # mimics netcdf-c style naming
-        if phony_dims == "sort":
-            self._determine_phony_dimensions()
+        if self._swmr and self._writable:
+            self._start_swmr_write()
+
+    def _start_swmr_write(self):
+        if not self._preexisting_file:
+            self.close()
+            raise ValueError(
+                "swmr writing needs an existing file, create the dimensions "
+                "and variables first (with libver='latest')"
+            )
+        try:
+            self._h5file.swmr_mode = True
+        except (RuntimeError, ValueError) as err:
+            self.close()
+            raise ValueError(
+                f"can not start swmr writing of {self._filename!r}, the file "
+                "needs to be created with libver='latest'"
+            ) from err
 
     def _get_maximum_dimension_id(self):
         dimids = []
@@ -1979,12 +3155,37 @@ class File(Group):
 
         return max(dimids) if dimids else -1
 
-    def _determine_phony_dimensions(self):
-        def create_phony_dimensions(grp):
-            for name in grp.groups:
-                create_phony_dimensions(grp[name])
+    def _sort_phony_dimensions(self):
+        """Return the names of the phony dimensions of all groups by group path.
 
-        create_phony_dimensions(self)
+        Dimension ids are assigned to the labeled and phony dimensions of
+        each group in depth-first order of the groups, as in netcdf-c. The
+        hierarchy is walked once reading only the metadata of the datasets,
+        without instantiating the groups.
+        """
+        names = {}
+        phony_count = 0
+        # ids of the root group are counted before the maximum id of the
+        # file is known, see __init__
+        max_dim_id = -1
+        pending = [("/", self._h5file["/"])]
+        while pending:
+            h5path, h5group = pending.pop()
+            labeled_dims, phony_dims, children = _scan_phony_dims(self, h5group)
+            max_dim_id += sum(labeled_dims.values())
+            group_names = []
+            for _ in _missing_phony_sizes(phony_dims, labeled_dims):
+                group_names.append(f"phony_dim_{phony_count + max_dim_id + 1}")
+                phony_count += 1
+            if group_names:
+                names[h5path] = group_names
+            if h5path == "/" and self._writable:
+                max_dim_id = self._get_maximum_dimension_id()
+            pending.extend(
+                (_join_h5paths(h5path, name), h5group[name])
+                for name in reversed(children)
+            )
+        return names
 
     def _check_valid_netcdf_dtype(self, dtype):
         dtype = np.dtype(dtype)
@@ -2040,6 +3241,7 @@ class File(Group):
 
     def flush(self):
         if self._writable:
+            self._trim_extents()
             # only write `_NCProperties` in newly created files
             if not self._preexisting_file and not self.invalid_netcdf:
                 _NC_PROPERTIES = (
@@ -2077,6 +3279,9 @@ class File(Group):
                     del self.attrs._h5attrs["_NCProperties"]
                 if "_nc3_strict" in self.attrs._h5attrs:
                     del self.attrs._h5attrs["_nc3_strict"]
+            if self._swmr:
+                # make the changes visible to SWMR readers
+                self._h5file.flush()
 
     sync = flush
 
@@ -2086,13 +3291,154 @@ class File(Group):
             raise ValueError(f"I/O operation on {self}: {self._filename!r}")
         return self.__h5file
 
+    def refresh(self):
+        """Update the view of a file which is concurrently written (SWMR).
+
+        Readers refresh the extents of all variables and dimensions with
+        unlimited axes and drop the cached dimension sizes, so that new
+        records become visible without reopening the file. Writers
+        :meth:`flush` their changes to make them visible to readers.
+
+        Only supported for files opened with ``swmr=True``.
+        """
+        if not self._swmr:
+            raise ValueError(
+                "refresh is only supported for files opened with swmr=True"
+            )
+        if self._writable:
+            self.flush()
+            return
+        h5file = self._h5file
+        if self._swmr_paths is None:
+            # no objects can be created while SWMR writing, collect them once
+            paths = []
+
+            def _unlimited(name, obj):
+                if isinstance(obj, h5py.Dataset) and None in (obj.maxshape or ()):
+                    paths.append(obj.name)
+
+            h5file.visititems(_unlimited)
+            self._swmr_paths = paths
+        for h5path in self._swmr_paths:
+            h5file[h5path].refresh()
+            if (h5ds := self._chunk_cache_handles.get(h5path)) is not None:
+                h5ds.refresh()
+        if self._memmaps:
+            self._memmaps.clear()
+        self._reset_dimension_sizes()
+
+    def _reset_dimension_sizes(self):
+        """Drop the dimension sizes cached by the loaded groups.
+
+        The size of an unlimited dimension follows its variables, any resize
+        can change it.
+        """
+        groups = [self]
+        while groups:
+            group = groups.pop()
+            group._dimensions._sizes = None
+            groups.extend(g for g in group._groups._objects.values() if g is not None)
+
+    def _resize_extent(self, h5ds, h5path, shape):
+        """Resize ``h5ds`` to the logical ``shape`` according to the growth policy.
+
+        Unlimited axes are over-allocated when growing, the logical shape is
+        kept in ``_grown`` until the extents are trimmed.
+        """
+        shape = tuple(shape)
+        policy = self._growth_policy
+        extent = h5ds.shape
+        self._reset_dimension_sizes()
+        if policy is None:
+            if extent != shape:
+                h5ds.resize(shape)
+            return
+        logical = self._grown.get(h5path, extent)
+        allocated = []
+        for axis, (size, current, old, maxsize) in enumerate(
+            zip(shape, extent, logical, h5ds.maxshape)
+        ):
+            if maxsize is not None or size < old:
+                # fixed axes and shrinking are exact
+                allocated.append(size)
+            elif size <= current:
+                allocated.append(current)
+            elif policy == "chunks":
+                chunk = h5ds.chunks[axis]
+                allocated.append(-(-size // chunk) * chunk)
+            else:
+                allocated.append(max(size, 2 * current))
+        allocated = tuple(allocated)
+        if allocated != extent:
+            h5ds.resize(allocated)
+        if allocated != shape:
+            self._grown[h5path] = shape
+        else:
+            self._grown.pop(h5path, None)
+
+    def _trim_extents(self):
+        """Trim over-allocated extents to the logical shapes.
+
+        The trimmed extents are written to disk right away, the logical
+        shapes are only known to this process.
+        """
+        if not self._grown:
+            return
+        for h5path, shape in self._grown.items():
+            self._h5file[h5path].resize(shape)
+        self._grown.clear()
+        self._h5file.flush()
+
+    def export_references(self, path=None, url=None):
+        """Export the byte ranges of all chunks as reference spec.
+
+        The spec is a JSON document in the format of kerchunk and fsspec's
+        ``ReferenceFileSystem`` (version 1), describing groups, dimensions
+        (as ``_ARRAY_DIMENSIONS``), attributes, dtypes, filters (as numcodecs
+        codecs) and the location of every stored chunk. Variables which can
+        not be described (eg. variable length types or unsupported filters)
+        are left out with a warning.
+
+        Parameters
+        ----------
+        path : path-like, optional
+            Location of the JSON file to write.
+        url : str, optional
+            Location of this file as seen by the readers. Defaults to the
+            absolute path of the file.
+
+        Returns
+        -------
+        spec : dict
+        """
+        return export_references(self, path=path, url=url)
+
+    @property
+    def _executor(self):
+        """Thread pool for chunk level work, None if not enabled."""
+        if self._chunk_workers is None:
+            return None
+        if self._chunk_executor is None:
+            self._chunk_executor = ThreadPoolExecutor(
+                max_workers=self._chunk_workers,
+                thread_name_prefix="h5netcdf-chunks",
+            )
+        return self._chunk_executor
+
     def close(self):
         if not self._closed:
             self.flush()
+            # release dataset handles before closing the file
+            self._chunk_cache_handles.clear()
             if self._close_h5file:
                 self._h5file.close()
             self.__h5file = None
             self._closed = True
+            if self._memmaps:
+                self._memmaps.clear()
+            if self._chunk_executor is not None:
+                self._chunk_executor.shutdown()
+                self._chunk_executor = None
 
     __del__ = close
 
@@ -2104,18 +3450,168 @@ class File(Group):
 
     _cls_name = "h5netcdf.File"
 
-    def __repr__(self):
-        if self._closed:
-            return f"<Closed {self._cls_name}>"
-        header = (
+    def _repr_header(self):
+        return (
             f"<{self._cls_name} "
             f"{os.path.basename(self.filename)!r} "
             f"(mode {self.mode}, backend {self.backend})>"
         )
-        return "\n".join([header] + self._repr_body())
 
 
-def _get_default_chunksizes(dimsizes, dtype):
+def _h5py_chunk_entries(h5ds):
+    """Return ``(chunk_offset, byte_offset, size, filter_mask)`` of stored chunks."""
+    import h5py
+
+    dsid = h5ds.id
+    layout = dsid.get_create_plist().get_layout()
+    if layout == h5py.h5d.CONTIGUOUS:
+        offset = dsid.get_offset()
+        if offset is None:
+            return []
+        return [((0,) * len(h5ds.shape), offset, dsid.get_storage_size(), 0)]
+    if layout != h5py.h5d.CHUNKED:
+        raise ValueError(f"variable {h5ds.name!r} has no chunk storage in the file")
+    entries = []
+
+    def collect(info):
+        entries.append(
+            (info.chunk_offset, info.byte_offset, info.size, info.filter_mask)
+        )
+
+    if hasattr(dsid, "chunk_iter"):
+        dsid.chunk_iter(collect)
+    else:
+        # h5py < 3.8 or HDF5 < 1.12.3
+        for i in range(dsid.get_num_chunks()):
+            collect(dsid.get_chunk_info(i))
+    return entries
+
+
+def _pyfive_chunk_entries(h5ds):
+    """Return ``(chunk_offset, byte_offset, size, filter_mask)`` of stored chunks."""
+    from pyfive.core import UNDEFINED_ADDRESS
+
+    dsid = h5ds.id
+    if dsid.layout_class == 1:
+        offset = dsid.data_offset
+        if offset is None or offset == UNDEFINED_ADDRESS:
+            return []
+        nbytes = int(np.prod(h5ds.shape)) * h5ds.dtype.itemsize
+        return [((0,) * len(h5ds.shape), offset, nbytes, 0)]
+    if dsid.layout_class != 2:
+        raise ValueError(f"variable {h5ds.name!r} has no chunk storage in the file")
+    return [
+        (info.chunk_offset, info.byte_offset, info.size, info.filter_mask)
+        for info in (dsid.index or {}).values()
+    ]
+
+
+def _first(items, root):
+    """Return the first ``repr_max_items`` of ``items``."""
+    return itertools.islice(items, root._repr_max_items)
+
+
+def _repr_section(title, count, items):
+    lines = [f"{title}:"] + [f"    {item}" for item in items]
+    if count > len(items):
+        lines.append(f"    ... ({count - len(items)} more)")
+    return lines
+
+
+def _next_prime(n):
+    """Return the smallest prime number >= n."""
+    n = max(int(n), 2)
+    while True:
+        if all(n % d for d in range(2, int(n**0.5) + 1)):
+            return n
+        n += 1
+
+
+def _auto_chunk_cache(shape, chunks, dtype, min_nbytes):
+    """Chunk cache parameters holding one row of chunks along the slowest axis.
+
+    Returns ``(nbytes, nslots)``. The cache is never smaller than
+    ``min_nbytes``, the number of hash slots is a prime of about 100 times
+    the number of chunks fitting into the cache as recommended by HDF5.
+    """
+    chunk_nbytes = int(np.prod(chunks)) * np.dtype(dtype).itemsize
+    nchunks = 1
+    for size, chunk in zip(shape[1:], chunks[1:]):
+        nchunks *= max(-(-size // chunk), 1)
+    nbytes = max(nchunks * chunk_nbytes, min_nbytes)
+    nslots = _next_prime(100 * max(nbytes // max(chunk_nbytes, 1), 1))
+    return nbytes, nslots
+
+
+def _check_chunk_cache(value):
+    """Normalize a chunk cache specification to keyword arguments."""
+    if value == "auto":
+        return {"nbytes": "auto"}
+    if isinstance(value, Mapping):
+        unknown = set(value) - {"nbytes", "nslots", "w0"}
+        if unknown:
+            raise ValueError(
+                f"unknown chunk cache parameters {sorted(unknown)}, "
+                "valid are 'nbytes', 'nslots' and 'w0'"
+            )
+        return dict(value)
+    raise TypeError(
+        f"chunk cache needs to be 'auto' or a mapping of nbytes/nslots/w0, got {value!r}"
+    )
+
+
+_ACCESS_PATTERNS = ("timeseries", "spatial", "balanced")
+_CHUNKING_HEURISTICS = (None, "h5netcdf", "h5py") + _ACCESS_PATTERNS
+_ACCESS_CHUNK_BYTES = 1024 * 1024
+
+
+def _fit_chunks(sizes, nelems):
+    """Scale ``sizes`` by a common factor so that the product is about ``nelems``.
+
+    Axes which would get less than one element are set to one and the
+    remaining budget is distributed over the other axes.
+    """
+    chunks = [1] * len(sizes)
+    free = list(range(len(sizes)))
+    while free:
+        factor = (nelems / np.prod([float(sizes[i]) for i in free])) ** (1 / len(free))
+        if factor >= 1:
+            for i in free:
+                chunks[i] = int(sizes[i])
+            break
+        small = [i for i in free if sizes[i] * factor < 1]
+        if not small:
+            for i in free:
+                chunks[i] = max(1, int(sizes[i] * factor))
+            break
+        free = [i for i in free if i not in small]
+    return chunks
+
+
+def _get_access_chunksizes(dimsizes, dtype, heuristic, time_axis, target_bytes):
+    """Return chunk sizes for the access pattern ``heuristic``.
+
+    ``timeseries`` chunks span as much of the time axis as the target size
+    allows, ``spatial`` chunks hold one time step, and ``balanced`` chunks
+    cover the same fraction of every axis. Without ``time_axis`` all
+    heuristics chunk as ``balanced``. As for the ``h5netcdf`` heuristic
+    unlimited dimensions of size zero are assumed to grow to 1024.
+    """
+    sizes = [size if size else 1024 for size in dimsizes]
+    nelems = max(int(target_bytes) // np.dtype(dtype).itemsize, 1)
+    others = [i for i in range(len(sizes)) if i != time_axis]
+    chunks = [1] * len(sizes)
+    if heuristic == "balanced" or time_axis is None or not others:
+        return tuple(_fit_chunks(sizes, nelems))
+    if heuristic == "timeseries":
+        chunks[time_axis] = min(sizes[time_axis], nelems)
+    budget = nelems // chunks[time_axis]
+    for i, chunk in zip(others, _fit_chunks([sizes[i] for i in others], budget)):
+        chunks[i] = chunk
+    return tuple(chunks)
+
+
+def _get_default_chunksizes(dimsizes, dtype, target_bytes=None):
     # This is a modified version of h5py's default chunking heuristic
     # https://github.com/h5py/h5py/blob/aa31f03bef99e5807d1d6381e36233325d944279/h5py/_hl/filters.py#L334-L389
     # (published under BSD-3-Clause, included at licenses/H5PY_LICENSE.txt)
@@ -2144,7 +3640,11 @@ def _get_default_chunksizes(dimsizes, dtype):
     dset_size = np.prod(chunks[~is_unlimited]) * type_size
     target_size = CHUNK_BASE * (2 ** np.log10(dset_size / (1024 * 1024)))
 
-    if target_size > CHUNK_MAX:
+    if target_bytes is not None:
+        # explicit target, which may exceed the default upper limit
+        target_size = target_bytes
+        CHUNK_MAX = max(CHUNK_MAX, target_bytes)
+    elif target_size > CHUNK_MAX:
         target_size = CHUNK_MAX
     elif target_size < CHUNK_MIN:
         target_size = CHUNK_MIN
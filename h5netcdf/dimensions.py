@@ -23,6 +23,10 @@ class Dimensions(MutableMapping):
     def __init__(self, group):
         self._group_ref = weakref.ref(group)
         self._objects = OrderedDict()
+        # dimension id -> name, built on first use
+        self._dimids = None
+        # dimension size -> names, built on first use
+        self._sizes = None
 
     @property
     def _group(self):
@@ -41,6 +45,45 @@ class Dimensions(MutableMapping):
             _check_classic_unlimited(size, self._unlimited())
 
         self._objects[name] = Dimension(self._group, name, size, create_h5ds=True)
+        self._index_dimid(name)
+        self._sizes = None
+
+    def _dimid_index(self):
+        """Return the mapping of dimension ids to names of this group.
+
+        The mapping is built once from the ``_Netcdf4Dimid`` attributes and
+        kept up to date when dimensions are added.
+        """
+        if self._dimids is None:
+            self._dimids = {
+                dim._dimid: name
+                for name, dim in self._objects.items()
+                if not dim._phony
+            }
+        return self._dimids
+
+    def _index_dimid(self, name, dimid=None):
+        """Update the id of dimension ``name`` in the index, if built."""
+        if self._dimids is None or self._objects[name]._phony:
+            return
+        for key in [k for k, v in self._dimids.items() if v == name]:
+            del self._dimids[key]
+        if dimid is None:
+            dimid = self._objects[name]._dimid
+        self._dimids[int(dimid)] = name
+
+    def _names_by_size(self):
+        """Return the mapping of dimension sizes to names of this group.
+
+        Names are listed in the order of the dimensions. The mapping is
+        built once and rebuilt after dimensions are added or resized.
+        """
+        if self._sizes is None:
+            sizes = {}
+            for dim in self._objects.values():
+                sizes.setdefault(dim.size, []).append(dim.name)
+            self._sizes = sizes
+        return self._sizes
 
     def _unlimited(self):
         """Return a tuple of unlimited dimensions."""
@@ -50,10 +93,13 @@ class Dimensions(MutableMapping):
         self._objects[name] = Dimension(
             self._group, name, size, create_h5ds=False, phony=True
         )
+        self._sizes = None
 
     def add(self, name):
         # adding dimensions which are already created in the file
         self._objects[name] = Dimension(self._group, name)
+        self._index_dimid(name)
+        self._sizes = None
 
     def __delitem__(self, key):
         raise NotImplementedError("cannot yet delete dimensions")
@@ -133,10 +179,13 @@ class Dimension:
             # because netcdf unlimited dimensions can be any length
             # but connected variables dimensions can have a certain larger length.
             reflist = self._h5ds.attrs.get("REFERENCE_LIST", None)
+            grown = self._root._grown
             if reflist is not None:
                 for ref, axis in reflist:
                     var = self._parent._h5group["/"][ref]
-                    size = max(var.shape[axis], size)
+                    # logical shape of over-allocated variables
+                    shape = grown.get(var.name, var.shape) if grown else var.shape
+                    size = max(shape[axis], size)
         return size
 
     def group(self):
@@ -172,7 +221,7 @@ class Dimension:
             raise ValueError(
                 f"Dimension '{self.name}' is not unlimited and thus cannot be resized."
             )
-        self._h5ds.resize((size,))
+        self._root._resize_extent(self._h5ds, self._h5path, (size,))
 
         # resize all referenced datasets for new API
         if not isinstance(self._root, Dataset):
@@ -204,6 +253,8 @@ class Dimension:
         if dimid is None:
             dimid = self._dimid
         self._h5ds.attrs["_Netcdf4Dimid"] = np.array(dimid, dtype=np.int32)
+        if self._name in self._parent._dimensions:
+            self._parent._dimensions._index_dimid(self._name, dimid)
 
         if len(self._h5ds.shape) > 1:
             dims = self._parent._variables[self._name].dimensions
@@ -247,6 +298,8 @@ class Dimension:
     def __len__(self):
         if self._phony:
             return self._size
+        if (shape := self._root._grown.get(self._h5path)) is not None:
+            return shape[0]
         return self._h5ds.shape[0]
 
     _cls_name = "h5netcdf.Dimension"
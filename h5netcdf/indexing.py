@@ -0,0 +1,212 @@
+"""Planning of orthogonal array selections.
+
+HDF5 point and fancy selections are slow for large index arrays, and h5py
+supports only one index array per selection. Integer arrays and boolean
+masks are therefore translated into runs of contiguous indices, which are
+read as hyperslabs. Runs separated by small gaps (eg.
+within the same chunk) are merged, and dense selections are read as one
+bounding slab. The requested order (including duplicates) is restored
+afterwards.
+"""
+
+import itertools
+
+import numpy as np
+
+#: read the bounding slab if at least this fraction of it is selected
+DENSE_FRACTION = 0.5
+
+#: merge runs separated by at most this many bytes of unselected data
+MERGE_GAP_BYTES = 64 * 1024
+
+#: maximum number of hyperslab reads for one selection
+MAX_BLOCKS = 4096
+
+
+def _expand_key(key, shape):
+    """Expand ``key`` to one entry per axis.
+
+    Returns None for keys which are not handled here (eg. ``np.newaxis``,
+    multidimensional arrays or multiple Ellipsis).
+    """
+    key = key if isinstance(key, tuple) else (key,)
+    ellipsis = [i for i, k in enumerate(key) if k is Ellipsis]
+    if len(ellipsis) > 1:
+        return None
+    if ellipsis:
+        i = ellipsis[0]
+        key = key[:i] + (slice(None),) * (len(shape) - len(key) + 1) + key[i + 1 :]
+    if len(key) > len(shape):
+        return None
+    key = key + (slice(None),) * (len(shape) - len(key))
+
+    expanded = []
+    for k, size in zip(key, shape):
+        if isinstance(k, (slice, int, np.integer)):
+            expanded.append(k)
+            continue
+        if k is None or isinstance(k, (str, bytes)):
+            return None
+        k = np.asarray(k)
+        if k.ndim != 1:
+            return None
+        if k.dtype == bool:
+            if k.shape[0] != size:
+                return None
+            k = np.flatnonzero(k)
+        elif k.dtype.kind not in "iu":
+            return None
+        k = k.astype(np.int64)
+        k = np.where(k < 0, k + size, k)
+        if k.size and (k.min() < 0 or k.max() >= size):
+            raise IndexError(f"index out of range for dimension of size {size}")
+        expanded.append(k)
+    return tuple(expanded)
+
+
+def _array_axes(key):
+    return [i for i, k in enumerate(key) if isinstance(k, np.ndarray)]
+
+
+def _blocks(indices, max_gap, chunk=None, dense_fraction=DENSE_FRACTION):
+    """Group sorted unique ``indices`` into blocks of ``(start, stop)``.
+
+    Contiguous runs separated by at most ``max_gap`` unselected indices, or
+    falling into the same chunk of size ``chunk``, are merged. If the
+    selection covers at least ``dense_fraction`` of its bounding range a
+    single block is returned.
+    """
+    first, last = int(indices[0]), int(indices[-1]) + 1
+    if indices.size >= dense_fraction * (last - first):
+        return np.array([first]), np.array([last])
+    split = np.diff(indices) > max_gap + 1
+    if chunk is not None:
+        # indices within the same chunk are decompressed anyway
+        split &= indices[1:] // chunk != indices[:-1] // chunk
+    breaks = np.flatnonzero(split) + 1
+    starts = indices[np.r_[0, breaks]]
+    stops = indices[np.r_[breaks - 1, indices.size - 1]] + 1
+    return starts, stops
+
+
+def _limit_blocks(starts, stops, nblocks):
+    """Merge the blocks separated by the smallest gaps until ``nblocks`` remain."""
+    if len(starts) <= nblocks:
+        return starts, stops
+    gaps = starts[1:] - stops[:-1]
+    # the largest gaps are kept as block boundaries
+    keep = np.sort(np.argsort(gaps, kind="stable")[len(gaps) - (nblocks - 1) :])
+    if nblocks == 1:
+        keep = keep[:0]
+    return np.r_[starts[0], starts[keep + 1]], np.r_[stops[keep], stops[-1]]
+
+
+def _max_gap(h5ds, key, axis):
+    """Number of indices along ``axis`` which are cheaper to read than skip."""
+    nbytes = h5ds.dtype.itemsize
+    for i, (k, size) in enumerate(zip(key, h5ds.shape)):
+        if i == axis:
+            continue
+        if isinstance(k, slice):
+            nbytes *= len(range(*k.indices(size)))
+        elif isinstance(k, np.ndarray):
+            nbytes *= k.size
+    return MERGE_GAP_BYTES // max(nbytes, 1)
+
+
+def read_coalesced(h5ds, key):
+    """Read an orthogonal selection with index arrays via hyperslabs.
+
+    Any number of axes can be indexed with integer arrays or boolean masks,
+    the selection is outer (orthogonal) as for netCDF4-python. The blocks of
+    all array axes are combined and read one by one into the preallocated
+    result, so memory use is proportional to the output.
+
+    Returns None if ``key`` is not handled, in which case the caller should
+    index ``h5ds`` directly.
+    """
+    expanded = _expand_key(key, h5ds.shape)
+    if expanded is None:
+        return None
+    axes = _array_axes(expanded)
+    if not axes or any(expanded[axis].size == 0 for axis in axes):
+        return None
+
+    # position of each axis in the result, integer axes are dropped
+    out_axes = np.cumsum([not isinstance(k, (int, np.integer)) for k in expanded]) - 1
+
+    plans = {}
+    for axis in axes:
+        unique, inverse = np.unique(expanded[axis], return_inverse=True)
+        plans[axis] = [unique, inverse.reshape(-1)]
+    # the gap heuristic uses the number of selected elements of other axes
+    unique_key = tuple(plans[i][0] if i in plans else k for i, k in enumerate(expanded))
+    chunks = h5ds.chunks
+    for axis in axes:
+        plans[axis] += _blocks(
+            plans[axis][0],
+            _max_gap(h5ds, unique_key, axis),
+            chunk=None if chunks is None else chunks[axis],
+        )
+
+    # bound the number of reads by merging blocks along the busiest axis
+    while np.prod([len(plans[axis][2]) for axis in axes]) > MAX_BLOCKS:
+        axis = max(axes, key=lambda axis: len(plans[axis][2]))
+        unique, inverse, starts, stops = plans[axis]
+        plans[axis][2:] = _limit_blocks(starts, stops, max(len(starts) // 2, 1))
+
+    for axis in axes:
+        unique, inverse, starts, stops = plans[axis]
+        plans[axis] += [
+            np.searchsorted(unique, starts),
+            np.searchsorted(unique, stops),
+        ]
+
+    out = None
+    for blocks in itertools.product(*(range(len(plans[axis][2])) for axis in axes)):
+        source = list(expanded)
+        dest = [slice(None)] * (out_axes[-1] + 1)
+        selections = []
+        for axis, b in zip(axes, blocks):
+            unique, inverse, starts, stops, first, last = plans[axis]
+            start, stop = int(starts[b]), int(stops[b])
+            source[axis] = slice(start, stop)
+            dest[out_axes[axis]] = slice(first[b], last[b])
+            selected = unique[first[b] : last[b]] - start
+            if selected.size != stop - start:
+                selections.append((out_axes[axis], selected))
+        block = h5ds[tuple(source)]
+        for out_axis, selected in selections:
+            block = np.take(block, selected, axis=out_axis)
+        if out is None:
+            shape = list(block.shape)
+            for axis in axes:
+                shape[out_axes[axis]] = plans[axis][0].size
+            out = np.empty(shape, dtype=block.dtype)
+        out[tuple(dest)] = block
+
+    # restore requested order and duplicates
+    for axis in axes:
+        unique, inverse = plans[axis][:2]
+        if unique.size != inverse.size or np.any(np.diff(inverse) < 0):
+            out = np.take(out, inverse, axis=out_axes[axis])
+    return out
+
+
+def outer_index(array, key):
+    """Index the in-memory ``array`` orthogonally, as ``read_coalesced``.
+
+    numpy combines multiple index arrays pointwise, here each index array
+    selects along its own axis. Returns None if ``key`` is not handled.
+    """
+    expanded = _expand_key(key, array.shape)
+    if expanded is None:
+        return None
+    axes = _array_axes(expanded)
+    if not axes:
+        return array[key]
+    out_axes = np.cumsum([not isinstance(k, (int, np.integer)) for k in expanded]) - 1
+    data = array[tuple(slice(None) if i in axes else k for i, k in enumerate(expanded))]
+    for axis in axes:
+        data = np.take(data, expanded[axis], axis=out_axes[axis])
+    return data
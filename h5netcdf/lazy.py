@@ -0,0 +1,165 @@
+"""Lazily indexed views of variables.
+
+A :class:`LazyArray` records selections instead of reading data. Each
+selection is composed with the previous ones into one index per axis of the
+variable (an integer, a ``range`` or an integer array), so that chained
+selections are resolved with a single read once the data is requested.
+"""
+
+import numpy as np
+
+from .indexing import _expand_key
+
+
+def _compose(index, key, size):
+    """Apply ``key`` to the per-axis ``index`` (a ``range`` or integer array)."""
+    if isinstance(key, (int, np.integer)):
+        if not -size <= key < size:
+            raise IndexError(
+                f"index {key} is out of bounds for dimension of size {size}"
+            )
+        return int(index[key])
+    if isinstance(key, slice):
+        return index[key]
+    # integer array, bool masks and negative indices are already normalized
+    if isinstance(index, range):
+        return index.start + key * index.step
+    return index[key]
+
+
+def _to_key(index):
+    """Translate a per-axis index into an index expression of the variable."""
+    if isinstance(index, range):
+        if index.step < 0:
+            # negative steps are not supported by the backends
+            return np.arange(index.start, index.stop, index.step)
+        if not index:
+            return slice(0, 0)
+        return slice(index.start, index.stop, index.step)
+    return index
+
+
+class LazyArray:
+    """Lazily indexed view of a :class:`h5netcdf.Variable`.
+
+    Indexing a ``LazyArray`` returns a new ``LazyArray`` without reading any
+    data. Selections follow the (orthogonal) indexing rules of variables:
+    integers, slices, Ellipsis, integer arrays and boolean masks. The data is
+    read with a single selection of the variable when converted to an array
+    (``np.asarray``, ``values``).
+
+    Examples
+    --------
+    >>> box = var.lazy[:, 100:200, 300:400]
+    >>> every_third = box[::3]
+    >>> points = every_third[:, [0, 5, 17], [2, 3, 4]]
+    >>> points.shape
+    (...)
+    >>> data = points.values
+    """
+
+    _cls_name = "h5netcdf.LazyArray"
+
+    def __init__(self, variable, index=None):
+        self._variable = variable
+        if index is None:
+            index = tuple(range(size) for size in variable.shape)
+        self._index = index
+
+    @property
+    def variable(self):
+        """The underlying variable."""
+        return self._variable
+
+    @property
+    def name(self):
+        return self._variable.name
+
+    @property
+    def dtype(self):
+        return self._variable.dtype
+
+    @property
+    def dimensions(self):
+        """Names of the dimensions of the view."""
+        return tuple(
+            dim
+            for dim, index in zip(self._variable.dimensions, self._index)
+            if not isinstance(index, int)
+        )
+
+    @property
+    def shape(self):
+        return tuple(len(index) for index in self._index if not isinstance(index, int))
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def __len__(self):
+        if not self.ndim:
+            raise TypeError("len() of unsized object")
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        shape = self.shape
+        expanded = _expand_key(key, shape)
+        if expanded is None:
+            raise IndexError(
+                f"unsupported index {key!r} for lazy view of shape {shape}"
+            )
+        expanded = iter(zip(expanded, shape))
+        index = []
+        for current in self._index:
+            if isinstance(current, int):
+                index.append(current)
+            else:
+                k, size = next(expanded)
+                index.append(_compose(current, k, size))
+        return type(self)(self._variable, tuple(index))
+
+    @property
+    def key(self):
+        """Index expression of the variable equivalent to this view."""
+        return tuple(_to_key(index) for index in self._index)
+
+    @property
+    def values(self):
+        """Read the data of the view."""
+        key = self.key
+        if self._variable._backend == "h5py" or not any(
+            isinstance(k, np.ndarray) for k in key
+        ):
+            return self._variable[key]
+        # read bounding slabs of index arrays and select in memory
+        slab_key = []
+        selections = []
+        axis = 0
+        for k in key:
+            if isinstance(k, np.ndarray):
+                if k.size:
+                    start = int(k.min())
+                    slab_key.append(slice(start, int(k.max()) + 1))
+                    selections.append((axis, k - start))
+                else:
+                    slab_key.append(slice(0, 0))
+            else:
+                slab_key.append(k)
+            axis += not isinstance(k, int)
+        data = self._variable[tuple(slab_key)]
+        for axis, selected in selections:
+            data = np.take(data, selected, axis=axis)
+        return data
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.values, dtype=dtype)
+
+    def __repr__(self):
+        return (
+            f"<{self._cls_name} {self.name!r}: dimensions {self.dimensions}, "
+            f"shape {self.shape}, dtype {self.dtype}>"
+        )
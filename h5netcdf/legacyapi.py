@@ -78,6 +78,42 @@ class HasAttributesMixin:
 class Variable(core.BaseVariable, HasAttributesMixin):
     _cls_name = "h5netcdf.legacyapi.Variable"
 
+    def __init__(self, parent, name, dimensions=None):
+        self._auto_mask = False
+        self._auto_scale = False
+        super().__init__(parent, name, dimensions)
+
+    def __getitem__(self, key):
+        dtype = self._h5ds.dtype
+        if (self._auto_mask or self._auto_scale) and dtype.kind in "iuf":
+            return self._read_cf(
+                key,
+                mask=self._auto_mask,
+                scale=self._auto_scale,
+                masked=self._auto_mask,
+            )
+        return super().__getitem__(key)
+
+    def set_auto_maskandscale(self, maskandscale):
+        """Turn on or off automatic masking and scaling when reading data.
+
+        Masking returns masked arrays, where values equal to ``_FillValue``
+        or ``missing_value`` or outside of ``valid_min``, ``valid_max`` or
+        ``valid_range`` are masked. Scaling applies ``scale_factor`` and
+        ``add_offset``. Both are done in a single pass while reading, data is
+        not packed when writing. Defaults to ``False``.
+        """
+        self._auto_mask = bool(maskandscale)
+        self._auto_scale = bool(maskandscale)
+
+    def set_auto_mask(self, mask):
+        """Turn on or off automatic masking when reading data."""
+        self._auto_mask = bool(mask)
+
+    def set_auto_scale(self, scale):
+        """Turn on or off automatic scaling when reading data."""
+        self._auto_scale = bool(scale)
+
     def chunking(self):
         """Return variable chunking information.
 
@@ -101,6 +137,15 @@ class Variable(core.BaseVariable, HasAttributesMixin):
             "zlib": self._h5ds.compression == "gzip",
         }
 
+    def get_var_chunk_cache(self):
+        """Return chunk cache information as tuple (size, nelems, preemption)."""
+        cache = self.chunk_cache
+        return cache["nbytes"], cache["nslots"], cache["w0"]
+
+    def set_var_chunk_cache(self, size=None, nelems=None, preemption=None):
+        """Set chunk cache size in bytes, number of slots and preemption."""
+        self.set_chunk_cache(nbytes=size, nslots=nelems, w0=preemption)
+
     @property
     def dtype(self):
         """Return netCDF4.Variable numpy dtype."""
@@ -137,6 +182,24 @@ class Group(core.Group, HasAttributesMixin):
     def _group_cls(self):
         return Group
 
+    def _set_auto(self, method, value):
+        for var in self.variables.values():
+            getattr(var, method)(value)
+        for group in self.groups.values():
+            group._set_auto(method, value)
+
+    def set_auto_maskandscale(self, maskandscale):
+        """Call ``set_auto_maskandscale`` for all variables in this group and its subgroups."""
+        self._set_auto("set_auto_maskandscale", maskandscale)
+
+    def set_auto_mask(self, mask):
+        """Call ``set_auto_mask`` for all variables in this group and its subgroups."""
+        self._set_auto("set_auto_mask", mask)
+
+    def set_auto_scale(self, scale):
+        """Call ``set_auto_scale`` for all variables in this group and its subgroups."""
+        self._set_auto("set_auto_scale", scale)
+
     createGroup = core.Group.create_group
     createEnumType = core.Group.create_enumtype
     createVLType = core.Group.create_vltype
@@ -173,6 +236,7 @@ class Group(core.Group, HasAttributesMixin):
         chunksizes=None,
         fill_value=None,
         endian="native",
+        chunk_cache=None,
     ):
         """Creates a new variable.
 
@@ -204,6 +268,8 @@ class Group(core.Group, HasAttributesMixin):
         endian : str, optional
             Control on-disk storage format.
             Can be any of ``little``, ``big`` or ``native`` (default).
+        chunk_cache : int, optional
+            Size of the raw data chunk cache of the variable in bytes.
 
         Returns
         -------
@@ -238,6 +304,9 @@ class Group(core.Group, HasAttributesMixin):
             if dtype.byteorder != "|":
                 datatype = dtype.newbyteorder("S")
 
+        if chunk_cache is not None:
+            kwds["chunk_cache"] = {"nbytes": chunk_cache}
+
         # closer to netCDF4 chunking behavior
         kwds["chunking_heuristic"] = "h5netcdf"
 
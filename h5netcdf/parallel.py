@@ -0,0 +1,226 @@
+"""Chunk level parallelism.
+
+Decompression of chunks is done in a thread pool; zlib and most other
+compressors release the GIL, so this scales with the number of workers.
+File access itself stays serial.
+
+For writing, chunks are encoded with the filter pipeline of the variable
+(shuffle, deflate and fletcher32 are supported) in the thread pool and
+committed with direct chunk writes, bypassing the HDF5 filter pipeline.
+"""
+
+import itertools
+import struct
+import zlib
+from collections import deque
+from operator import mul
+
+import numpy as np
+
+_FILTER_DEFLATE = 1
+_FILTER_SHUFFLE = 2
+_FILTER_FLETCHER32 = 3
+
+# pyfive DatasetID internals used for reading chunks
+_PYFIVE_DATASETID_ATTRS = ("index", "chunks", "_decode_chunk", "_fh", "posix")
+
+
+def _pyfive_filtered_chunks(h5ds):
+    """Return the pyfive DatasetID if ``h5ds`` is chunked and filtered.
+
+    Returns None as well if the pyfive internals used here are missing (eg.
+    after a pyfive upgrade), so that reads fall back to pyfive itself.
+    """
+    dsid = getattr(h5ds, "id", None)
+    if (
+        getattr(dsid, "layout_class", None) != 2
+        or not all(hasattr(dsid, attr) for attr in _PYFIVE_DATASETID_ATTRS)
+        or dsid.filter_pipeline is None
+        or getattr(h5ds, "_astype", None) is not None
+    ):
+        return None
+    dtype = h5ds.dtype
+    if dtype.kind == "O" or dtype.hasobject or dtype.metadata:
+        # vlen strings and references are decoded by pyfive
+        return None
+    return dsid
+
+
+def read_chunks_pyfive(h5ds, key, executor):
+    """Read ``key`` from a pyfive dataset, decoding chunks in ``executor``.
+
+    Returns None if the dataset is not chunked and filtered, in which case
+    the caller should fall back to the regular read path.
+    """
+    try:
+        from pyfive.indexing import OrthogonalIndexer, ZarrArrayStub
+    except ImportError:
+        return None
+
+    dsid = _pyfive_filtered_chunks(h5ds)
+    if dsid is None:
+        return None
+    index = dsid.index
+    if not index:
+        return None
+
+    dtype = h5ds.dtype
+    chunks = dsid.chunks
+    indexer = OrthogonalIndexer(key, ZarrArrayStub(h5ds.shape, chunks))
+    out = np.empty(indexer.shape, dtype=dtype)
+    fillvalue = h5ds.fillvalue
+
+    def decode(chunk_sel, out_sel, filter_mask, buffer):
+        out[out_sel] = dsid._decode_chunk(buffer, filter_mask, dtype)[chunk_sel]
+
+    # reading is serial (one file handle), decoding overlaps with reading
+    futures = []
+    fh = dsid._fh
+    try:
+        for chunk_coords, chunk_sel, out_sel in indexer:
+            storeinfo = index.get(tuple(map(mul, chunk_coords, chunks)))
+            if storeinfo is None:
+                # chunk was never written
+                out[out_sel] = fillvalue
+                continue
+            fh.seek(storeinfo.byte_offset)
+            buffer = fh.read(storeinfo.size)
+            futures.append(
+                executor.submit(
+                    decode, chunk_sel, out_sel, storeinfo.filter_mask, buffer
+                )
+            )
+    finally:
+        if dsid.posix:
+            fh.close()
+        for future in futures:
+            future.result()
+    return out
+
+
+def _h5py_filter_pipeline(h5ds):
+    """Return the filters of ``h5ds`` as list of ``(filter_id, cd_values)``.
+
+    Returns None if the dataset is not chunked or uses a filter which can not
+    be applied here.
+    """
+    dcpl = h5ds.id.get_create_plist()
+    if h5ds.chunks is None:
+        return None
+    pipeline = []
+    for i in range(dcpl.get_nfilters()):
+        filter_id, _, cd_values, _ = dcpl.get_filter(i)
+        if filter_id not in (_FILTER_DEFLATE, _FILTER_SHUFFLE, _FILTER_FLETCHER32):
+            return None
+        pipeline.append((filter_id, cd_values))
+    return pipeline
+
+
+def _fletcher32(data):
+    """Fletcher-32 checksum as computed by the HDF5 fletcher32 filter."""
+    if len(data) % 2:
+        data += b"\x00"
+    words = np.frombuffer(data, dtype=">u2").astype(np.uint64)
+    if not words.any():
+        return 0
+    # HDF5 folds the sums periodically, which keeps them congruent modulo
+    # 65535 and non-zero, so the result can be computed from the totals
+    n = words.size
+    sum1 = int(words.sum() % 65535)
+    weights = (n - np.arange(n, dtype=np.uint64)) % 65535
+    sum2 = int((words * weights % 65535).sum() % 65535)
+    return ((sum2 or 65535) << 16) | (sum1 or 65535)
+
+
+def _encode_chunk(chunk, pipeline):
+    data = chunk.tobytes()
+    for filter_id, cd_values in pipeline:
+        if filter_id == _FILTER_SHUFFLE:
+            itemsize = cd_values[0] if cd_values else chunk.dtype.itemsize
+            if itemsize > 1:
+                data = np.frombuffer(data, dtype=np.uint8)
+                data = data.reshape(-1, itemsize).T.tobytes()
+        elif filter_id == _FILTER_DEFLATE:
+            data = zlib.compress(data, cd_values[0] if cd_values else 6)
+        elif filter_id == _FILTER_FLETCHER32:
+            data += struct.pack("<I", _fletcher32(data))
+    return data
+
+
+def write_chunks_h5py(h5ds, selection, squeeze, value, executor, max_pending):
+    """Write ``value`` to ``selection`` of a h5py dataset via direct chunk writes.
+
+    ``selection`` and ``squeeze`` describe a basic selection as returned by
+    ``_basic_selection``. Chunks are encoded in ``executor`` and written
+    serially in order, with at most ``max_pending`` encoded chunks held in
+    memory. Partially covered chunks are read, updated and rewritten.
+
+    Returns False if the write is not supported, in which case the caller
+    should write through h5py.
+    """
+    dtype = h5ds.dtype
+    if dtype.kind not in "iuf" or any(step != 1 for _, _, step in selection):
+        return False
+    pipeline = _h5py_filter_pipeline(h5ds)
+    if pipeline is None:
+        return False
+    value = np.asarray(value)
+    if value.dtype.kind not in "biuf":
+        return False
+    counts = tuple(stop - start for start, stop, _ in selection)
+    if not all(counts):
+        return True
+    # integer indexed axes are dropped from the value
+    out_shape = tuple(c for c, s in zip(counts, squeeze) if not s)
+    try:
+        data = np.broadcast_to(value, out_shape).reshape(counts)
+    except ValueError:
+        # same error as h5py
+        raise TypeError(f"Can't broadcast {value.shape} -> {out_shape}") from None
+
+    chunks = h5ds.chunks
+    shape = h5ds.shape
+    fillvalue = h5ds.fillvalue
+    ranges = [
+        range(start // c, -(-stop // c))
+        for (start, stop, _), c in zip(selection, chunks)
+    ]
+
+    def prepare(index):
+        offset = tuple(i * c for i, c in zip(index, chunks))
+        extent = tuple(min(c, s - o) for c, s, o in zip(chunks, shape, offset))
+        # overlap of the chunk and the selection, in chunk coordinates
+        lo = tuple(max(start - o, 0) for (start, _, _), o in zip(selection, offset))
+        hi = tuple(
+            min(stop - o, e) for (_, stop, _), o, e in zip(selection, offset, extent)
+        )
+        chunk = np.empty(chunks, dtype=dtype)
+        if extent != chunks:
+            chunk[...] = fillvalue
+        if lo != (0,) * len(lo) or hi != extent:
+            # partially written chunk, keep the current contents
+            region = tuple(slice(o, o + e) for o, e in zip(offset, extent))
+            chunk[tuple(slice(0, e) for e in extent)] = h5ds[region]
+        source = tuple(
+            slice(o + a - start, o + b - start)
+            for (start, _, _), o, a, b in zip(selection, offset, lo, hi)
+        )
+        chunk[tuple(slice(a, b) for a, b in zip(lo, hi))] = data[source]
+        return offset, chunk
+
+    pending = deque()
+    dsid = h5ds.id
+    try:
+        for index in itertools.product(*ranges):
+            offset, chunk = prepare(index)
+            pending.append((offset, executor.submit(_encode_chunk, chunk, pipeline)))
+            if len(pending) >= max_pending:
+                offset, future = pending.popleft()
+                dsid.write_direct_chunk(offset, future.result())
+        while pending:
+            offset, future = pending.popleft()
+            dsid.write_direct_chunk(offset, future.result())
+    finally:
+        for _, future in pending:
+            future.cancel()
+    return True
@@ -0,0 +1,182 @@
+"""Export of chunk references.
+
+The references follow the JSON format of kerchunk and fsspec's
+``ReferenceFileSystem`` (version 1): Zarr v2 metadata keys (``.zgroup``,
+``.zarray``, ``.zattrs``) map to JSON documents, and chunk keys map to
+``[url, offset, size]`` byte ranges in the netCDF4 file. Readers which do not
+link HDF5 can then fetch and decode the chunks themselves. HDF5 filters are
+translated to the corresponding numcodecs codecs.
+"""
+
+import base64
+import json
+import os
+import warnings
+
+import numpy as np
+
+# HDF5 filter id -> numcodecs codec config
+_CODECS = {
+    1: lambda cd, itemsize: {"id": "zlib", "level": int(cd[0]) if cd else 6},
+    2: lambda cd, itemsize: {
+        "id": "shuffle",
+        "elementsize": int(cd[0]) if cd else itemsize,
+    },
+    3: lambda cd, itemsize: {"id": "fletcher32"},
+    307: lambda cd, itemsize: {"id": "bz2", "level": int(cd[0]) if cd else 9},
+    32001: lambda cd, itemsize: {"id": "blosc"},
+    32015: lambda cd, itemsize: {"id": "zstd", "level": int(cd[0]) if cd else 0},
+}
+
+
+def _filter_pipeline(h5ds):
+    """Return the filters of ``h5ds`` as list of ``(filter_id, cd_values)``."""
+    dsid = h5ds.id
+    if hasattr(dsid, "get_create_plist"):
+        dcpl = dsid.get_create_plist()
+        filters = [dcpl.get_filter(i) for i in range(dcpl.get_nfilters())]
+        return [(filter_id, cd_values) for filter_id, _, cd_values, _ in filters]
+    # pyfive
+    return [
+        (f["filter_id"], tuple(f.get("client_data", ())))
+        for f in (dsid.filter_pipeline or [])
+    ]
+
+
+def _codecs(h5ds):
+    """Return numcodecs configs for the filters of ``h5ds``, None if unsupported."""
+    codecs = []
+    for filter_id, cd_values in _filter_pipeline(h5ds):
+        if filter_id not in _CODECS:
+            return None
+        codecs.append(_CODECS[filter_id](cd_values, h5ds.dtype.itemsize))
+    return codecs
+
+
+def _json_value(value):
+    """Convert attribute values to JSON serializable objects."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "surrogateescape")
+    if isinstance(value, np.ndarray):
+        return [_json_value(v) for v in value.tolist()]
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, np.generic):
+        return _json_value(value.item())
+    if isinstance(value, float) and not np.isfinite(value):
+        # Zarr v2 encoding of non finite values
+        return "NaN" if np.isnan(value) else ("Infinity" if value > 0 else "-Infinity")
+    return value
+
+
+def _fill_value(value, dtype):
+    """Encode ``value`` as ``fill_value`` of a Zarr v2 array."""
+    value = np.asarray(value, dtype=dtype)
+    if dtype.kind == "S":
+        return base64.b64encode(value.tobytes()).decode()
+    if dtype.kind == "c":
+        return [_json_value(value.real[()]), _json_value(value.imag[()])]
+    return _json_value(value[()])
+
+
+def _add_variable(refs, prefix, var, url):
+    h5ds = var._h5ds
+    dtype = h5ds.dtype
+    if dtype.hasobject or dtype.kind not in "biufcS":
+        return f"dtype {dtype}"
+    if dtype.metadata:
+        if dtype.kind != "S":
+            # eg. enum types
+            return f"dtype {dtype}"
+        # drop the string encoding of h5py
+        dtype = np.dtype(dtype.str)
+    codecs = _codecs(h5ds)
+    if codecs is None:
+        return "unsupported filters"
+    shape = var.shape
+    if h5ds.chunks is not None:
+        chunks = h5ds.chunks
+    else:
+        chunks = tuple(max(s, 1) for s in shape)
+    try:
+        index = var.chunk_index()
+    except ValueError:
+        index = None
+    if index is not None and index["filter_mask"].any():
+        return "chunks with skipped filters"
+
+    fillvalue = var.attrs.get("_FillValue", h5ds.fillvalue)
+    name = f"{prefix}{var.name.split('/')[-1]}"
+    refs[f"{name}/.zarray"] = json.dumps(
+        {
+            "zarr_format": 2,
+            "shape": list(shape),
+            "chunks": list(chunks),
+            "dtype": dtype.str,
+            "compressor": None,
+            "fill_value": _fill_value(fillvalue, dtype),
+            "filters": codecs or None,
+            "order": "C",
+            "dimension_separator": ".",
+        }
+    )
+    # the fill value is part of .zarray
+    attrs = {k: _json_value(v) for k, v in var.attrs.items() if k != "_FillValue"}
+    attrs["_ARRAY_DIMENSIONS"] = list(var.dimensions)
+    refs[f"{name}/.zattrs"] = json.dumps(attrs)
+
+    if index is None:
+        # eg. compact storage, inline the data
+        data = np.ascontiguousarray(h5ds[()], dtype=dtype).tobytes()
+        key = ".".join(["0"] * len(shape)) or "0"
+        refs[f"{name}/{key}"] = "base64:" + base64.b64encode(data).decode()
+        return None
+    for chunk, offset, size in zip(index["chunk"], index["offset"], index["size"]):
+        key = ".".join(str(i) for i in chunk) or "0"
+        refs[f"{name}/{key}"] = [url, int(offset), int(size)]
+    return None
+
+
+def _add_group(refs, group, url, skipped):
+    prefix = group.name.strip("/")
+    prefix = f"{prefix}/" if prefix else ""
+    refs[f"{prefix}.zgroup"] = json.dumps({"zarr_format": 2})
+    refs[f"{prefix}.zattrs"] = json.dumps(
+        {k: _json_value(v) for k, v in group.attrs.items()}
+    )
+    for var in group.variables.values():
+        reason = _add_variable(refs, prefix, var, url)
+        if reason is not None:
+            skipped.append(f"{var.name} ({reason})")
+    for child in group.groups.values():
+        _add_group(refs, child, url, skipped)
+
+
+def export_references(file, path=None, url=None):
+    """Return (and optionally write) the chunk references of ``file``.
+
+    See :meth:`h5netcdf.File.export_references`.
+    """
+    if file._backend not in ("h5py", "pyfive"):
+        raise ValueError(
+            f"chunk references are not available with the {file._backend!r} backend"
+        )
+    if file._writable:
+        # make sure all chunks are allocated in the file
+        file.flush()
+    if url is None:
+        url = os.path.abspath(file.filename)
+    refs = {}
+    skipped = []
+    _add_group(refs, file, os.fspath(url), skipped)
+    if skipped:
+        warnings.warn(
+            "variables without references (readers need HDF5): " + ", ".join(skipped),
+            UserWarning,
+            stacklevel=3,
+        )
+    spec = {"version": 1, "refs": refs}
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump(spec, f)
+    return spec
@@ -0,0 +1,247 @@
+"""HTTP session pooling for the h5pyd backend.
+
+By default every ``h5pyd.File`` creates its own ``requests.Session`` and
+queries the server info endpoint when it is opened. A :class:`SessionPool`
+shares keep-alive sessions (and the cached server info) between all files
+opened against the same endpoint and user, so that repeated opens skip
+connection setup.
+
+h5pyd creates the connection of a file inside ``h5pyd.File`` and offers no
+supported way to pass a session to it. While a file is being opened with a
+pool, the ``HttpConn`` class in h5pyd's modules is therefore replaced by a
+subclass, process wide. Connections created meanwhile by other threads without
+a pool get the subclass as well, but behave like ``HttpConn``. The subclass
+uses the private ``_s`` and ``_server_info`` attributes of ``HttpConn`` and
+falls back to unpooled connections if they are missing.
+"""
+
+import contextlib
+import importlib
+import threading
+
+DEFAULT_MAX_CONNECTIONS = 16
+
+# h5pyd modules creating the HttpConn of files (newer and older h5pyd)
+_HTTPCONN_MODULES = ("h5pyd.hsds_plugin", "h5pyd._hl.files")
+
+# pool which is active for the HttpConn objects created by the current thread
+_active = threading.local()
+_swap_lock = threading.Lock()
+# number of pooled opens in progress, and the replaced HttpConn classes
+_swapped = 0
+_originals = {}
+_pooled_conn_classes = {}
+
+
+class SessionPool:
+    """Pool of keep-alive HTTP sessions shared between h5pyd files.
+
+    One ``requests.Session`` is kept per (endpoint, username). Its connection
+    pool is bounded by ``max_connections``; requests exceeding that number
+    block until a connection is returned to the pool.
+
+    Parameters
+    ----------
+    max_connections : int
+        Maximum number of concurrent connections per endpoint.
+    retries : int
+        Number of retries on connection errors and server side errors.
+
+    Examples
+    --------
+    >>> pool = SessionPool(max_connections=8)
+    >>> for domain in domains:
+    ...     with h5netcdf.File(domain, "r", backend="h5pyd", session_pool=pool) as f:
+    ...         ...
+    >>> pool.close()
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, retries=3):
+        if max_connections < 1:
+            raise ValueError(
+                f"max_connections needs to be a positive integer, got {max_connections!r}"
+            )
+        self.max_connections = max_connections
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._server_info = {}
+        self._refcount = {}
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter, Retry
+
+        retry = Retry(
+            total=self.retries,
+            read=self.retries,
+            connect=self.retries,
+            backoff_factor=1,
+            status_forcelist=(500, 502, 503, 504),
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=1,
+            pool_maxsize=self.max_connections,
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def acquire(self, endpoint, username=None):
+        """Return the shared session for ``endpoint`` and ``username``."""
+        key = (endpoint, username)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._create_session()
+                self._refcount[key] = 0
+            self._refcount[key] += 1
+        return session
+
+    def release(self, endpoint, username=None):
+        """Mark a session as no longer used by a file.
+
+        The session is kept alive for subsequent opens until :meth:`close`.
+        """
+        key = (endpoint, username)
+        with self._lock:
+            if self._refcount.get(key, 0) > 0:
+                self._refcount[key] -= 1
+
+    def server_info(self, endpoint, username, fetch):
+        """Return cached server info, calling ``fetch`` on first use."""
+        key = (endpoint, username)
+        with self._lock:
+            info = self._server_info.get(key)
+            if info is None:
+                info = fetch()
+                if info:
+                    self._server_info[key] = info
+        return info
+
+    @property
+    def in_use(self):
+        """Number of open files using the pool."""
+        with self._lock:
+            return sum(self._refcount.values())
+
+    def close(self):
+        """Close all pooled sessions."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._server_info.clear()
+            self._refcount.clear()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"<h5netcdf.sessions.SessionPool: {len(self._sessions)} sessions, "
+            f"max_connections={self.max_connections}>"
+        )
+
+
+def _pooled_conn_cls(base):
+    """Return a subclass of h5pyd's ``HttpConn`` which uses the active pool."""
+    if (cls := _pooled_conn_classes.get(base)) is not None:
+        return cls
+
+    class PooledHttpConn(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pool = getattr(_active, "pool", None)
+            # h5pyd keeps the session in private attributes, fall back to
+            # unpooled connections if they are missing
+            if (
+                self.endpoint.startswith("http+unix://")
+                or not hasattr(self, "_s")
+                or not hasattr(self, "_server_info")
+            ):
+                pool = None
+            self._h5netcdf_session_pool = pool
+
+        def open(self):
+            pool = self._h5netcdf_session_pool
+            if pool is None:
+                return super().open()
+            if self._s:
+                return
+            self._s = pool.acquire(self.endpoint, self.username)
+
+        def close(self):
+            pool = self._h5netcdf_session_pool
+            if pool is None:
+                return super().close()
+            if self._s:
+                # keep the session alive for other files
+                self._s = None
+                pool.release(self.endpoint, self.username)
+
+        def serverInfo(self):
+            pool = self._h5netcdf_session_pool
+            if pool is None or self._server_info:
+                return super().serverInfo()
+            self._server_info = pool.server_info(
+                self.endpoint, self.username, super().serverInfo
+            )
+            return self._server_info
+
+    _pooled_conn_classes[base] = PooledHttpConn
+    return PooledHttpConn
+
+
+def _swap_conn_cls():
+    """Let h5pyd create pooled connections, until ``_restore_conn_cls``."""
+    global _swapped
+    with _swap_lock:
+        if not _swapped:
+            for name in _HTTPCONN_MODULES:
+                try:
+                    module = importlib.import_module(name)
+                except ImportError:
+                    continue
+                if (base := getattr(module, "HttpConn", None)) is not None:
+                    _originals[module] = base
+                    module.HttpConn = _pooled_conn_cls(base)
+        _swapped += 1
+
+
+def _restore_conn_cls():
+    global _swapped
+    with _swap_lock:
+        _swapped -= 1
+        if not _swapped:
+            for module, base in _originals.items():
+                module.HttpConn = base
+            _originals.clear()
+
+
+@contextlib.contextmanager
+def _use_pool(pool):
+    """Use ``pool`` for h5pyd connections created within this context.
+
+    h5pyd's connection class is replaced (for all threads) only while files
+    are opened with a pool, connections created meanwhile without a pool
+    behave as usual. See the module docstring.
+    """
+    if pool is None:
+        yield
+        return
+    _swap_conn_cls()
+    previous = getattr(_active, "pool", None)
+    _active.pool = pool
+    try:
+        yield
+    finally:
+        _active.pool = previous
+        _restore_conn_cls()
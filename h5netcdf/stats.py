@@ -0,0 +1,141 @@
+"""Per-chunk summary statistics.
+
+The minimum, maximum and number of valid (non-fill, non-NaN) values of
+every chunk of a variable are stored in a hidden dataset next to the
+variable, shaped like the grid of chunks. Readers can use them to skip
+chunks which can not match a query without reading any data.
+
+The records of the dataset also hold a reference to their variable. netCDF-C
+does not support reference types and skips the dataset, so other netCDF
+readers do not see the statistics.
+"""
+
+import numpy as np
+
+STATS_PREFIX = "_h5netcdf_chunk_stats_"
+
+# size of the chunks of the statistics dataset along each axis
+_STATS_CHUNK = 32
+
+
+def chunk_grid(shape, chunks):
+    """Return the number of chunks along each axis."""
+    return tuple(-(-s // c) for s, c in zip(shape, chunks))
+
+
+def stats_name(h5name):
+    """Return the name of the statistics dataset of variable ``h5name``."""
+    return STATS_PREFIX + h5name
+
+
+def _stats_dtype(dtype, ref_dtype):
+    return np.dtype(
+        [("min", dtype), ("max", dtype), ("count", "u8"), ("variable", ref_dtype)]
+    )
+
+
+def find_stats(h5group, h5name):
+    """Return the statistics dataset of variable ``h5name``, None if missing."""
+    name = stats_name(h5name)
+    return h5group[name] if name in h5group else None
+
+
+def load_stats(h5ds, stats):
+    """Return arrays of minimum, maximum and count, shaped like the chunk grid.
+
+    Chunks which are not covered by the stored statistics (eg. after
+    resizing) get a count of zero.
+    """
+    grid = chunk_grid(h5ds.shape, h5ds.chunks)
+    stored = stats[...]
+    result = (
+        np.zeros(grid, dtype=h5ds.dtype),
+        np.zeros(grid, dtype=h5ds.dtype),
+        np.zeros(grid, dtype="u8"),
+    )
+    region = tuple(slice(0, min(a, b)) for a, b in zip(grid, stored.shape))
+    for new, field in zip(result, ("min", "max", "count")):
+        new[region] = stored[field][region]
+    return result
+
+
+def _chunk_stats(data, fillvalue):
+    valid = np.ones(data.shape, dtype=bool)
+    if fillvalue is not None:
+        valid &= data != fillvalue
+    if data.dtype.kind == "f":
+        valid &= ~np.isnan(data)
+    count = int(np.count_nonzero(valid))
+    if not count:
+        return 0, 0, 0
+    if count != data.size:
+        data = data[valid]
+    return data.min(), data.max(), count
+
+
+def update_stats(h5group, h5name, h5ds, ref_dtype, fillvalue, lo=None, hi=None):
+    """Compute the statistics of the chunks from ``lo`` to ``hi`` (exclusive).
+
+    ``lo`` and ``hi`` are chunk grid coordinates and default to all chunks.
+    The chunks are read one row of chunks along the first axis at a time and
+    only the statistics of these chunks are written.
+    """
+    chunks = h5ds.chunks
+    shape = h5ds.shape
+    grid = chunk_grid(shape, chunks)
+    lo = (0,) * len(grid) if lo is None else lo
+    hi = grid if hi is None else hi
+    dtype = _stats_dtype(h5ds.dtype, ref_dtype)
+    stats = find_stats(h5group, h5name)
+    if stats is None:
+        stats = h5group.create_dataset(
+            stats_name(h5name),
+            shape=grid,
+            maxshape=(None,) * len(grid),
+            chunks=tuple(max(1, min(g, _STATS_CHUNK)) for g in grid),
+            dtype=dtype,
+        )
+    elif stats.shape != grid:
+        stats.resize(grid)
+
+    block = np.zeros(tuple(b - a for a, b in zip(lo, hi)), dtype=dtype)
+    if not block.size:
+        return
+    block["variable"] = h5ds.ref
+    for row in range(lo[0], hi[0]):
+        region = (slice(row * chunks[0], (row + 1) * chunks[0]),) + tuple(
+            slice(a * c, b * c) for a, b, c in zip(lo[1:], hi[1:], chunks[1:])
+        )
+        slab = h5ds[region]
+        offset = tuple(s.start for s in region)
+        for index in np.ndindex(*block.shape[1:]):
+            chunk = (row,) + tuple(a + i for a, i in zip(lo[1:], index))
+            local = tuple(
+                slice(i * c - o, (i + 1) * c - o)
+                for i, c, o in zip(chunk, chunks, offset)
+            )
+            pos = (row - lo[0],) + index
+            mn, mx, count = _chunk_stats(slab[local], fillvalue)
+            block["min"][pos] = mn
+            block["max"][pos] = mx
+            block["count"][pos] = count
+    stats[tuple(slice(a, b) for a, b in zip(lo, hi))] = block
+
+
+def matching_chunks(h5ds, stats, predicate):
+    """Return the slices of the chunks for which ``predicate(min, max)`` holds."""
+    mins, maxs, counts = load_stats(h5ds, stats)
+    selected = counts > 0
+    selected[selected] &= np.broadcast_to(
+        np.asarray(predicate(mins[selected], maxs[selected]), dtype=bool),
+        (np.count_nonzero(selected),),
+    )
+    chunks = h5ds.chunks
+    shape = h5ds.shape
+    return [
+        tuple(
+            slice(int(i) * c, min((int(i) + 1) * c, s))
+            for i, c, s in zip(index, chunks, shape)
+        )
+        for index in zip(*np.nonzero(selected))
+    ]
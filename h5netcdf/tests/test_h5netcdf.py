@@ -1,5 +1,6 @@
 import gc
 import io
+import pathlib
 import random
 import re
 import string
@@ -2141,6 +2142,75 @@ def test_h5netcdf_chunking(tmp_local_netcdf):
     assert chunks_h5netcdf == (5, 5, 5, 10)
 
 
+def test_access_pattern_chunking(tmp_local_netcdf):
+    def read_amplification(chunks, shape, key):
+        # number of elements in the touched chunks per element requested
+        touched = requested = 1
+        for c, s, k in zip(chunks, shape, key):
+            if isinstance(k, slice):
+                touched *= -(-s // c) * c
+                requested *= s
+            else:
+                touched *= c
+        return touched / requested
+
+    shape = (2000, 60, 120)
+    timeseries = (slice(None), 30, 60)
+    spatial = (100, slice(None), slice(None))
+    chunks = {}
+    with h5netcdf.File(tmp_local_netcdf, "w") as ds:
+        ds.dimensions = {"lat": 60, "lon": 120, "time": None}
+        ds.resize_dimension("time", 2000)
+        for heuristic in ["timeseries", "spatial", "balanced"]:
+            v = ds.create_variable(
+                heuristic,
+                ("time", "lat", "lon"),
+                "f4",
+                chunking_heuristic=heuristic,
+                chunk_target_bytes=256 * 1024,
+            )
+            chunks[heuristic] = v.chunks
+            assert np.prod(v.chunks) * 4 <= 256 * 1024
+        # time axis is the unlimited dimension
+        v = ds.create_variable(
+            "transposed", ("lat", "time"), "f4", chunking_heuristic="timeseries"
+        )
+        assert v.chunks == (60, 2000)
+        # without time axis all heuristics chunk as "balanced"
+        for heuristic in ["timeseries", "spatial", "balanced"]:
+            v = ds.create_variable(
+                f"map_{heuristic}",
+                ("lat", "lon"),
+                "f4",
+                chunking_heuristic=heuristic,
+                chunk_target_bytes=8 * 1024,
+            )
+            assert v.chunks == (32, 64)
+        v = ds.create_variable(
+            "small", ("time",), "f4", chunks=(10,), chunking_heuristic="balanced"
+        )
+        assert v.chunks == (10,)
+        with pytest.raises(ValueError, match="unrecognized value"):
+            ds.create_variable("x", ("lat",), "f4", chunking_heuristic="rows")
+        with pytest.raises(ValueError, match="chunk_target_bytes"):
+            ds.create_variable(
+                "x", ("lat",), "f4", chunking_heuristic="h5py", chunk_target_bytes=1024
+            )
+
+    assert chunks["timeseries"][0] == 2000
+    assert chunks["spatial"] == (1, 60, 120)
+    amplification = {
+        heuristic: (
+            read_amplification(c, shape, timeseries),
+            read_amplification(c, shape, spatial),
+        )
+        for heuristic, c in chunks.items()
+    }
+    assert amplification["timeseries"][0] < amplification["balanced"][0]
+    assert amplification["spatial"][1] == 1
+    assert amplification["balanced"][1] < amplification["timeseries"][1]
+
+
 def test_create_invalid_netcdf_catch_error(tmp_local_or_remote_netcdf):
     # see https://github.com/h5netcdf/h5netcdf/issues/138
     with h5netcdf.File(tmp_local_or_remote_netcdf, "w") as f:
@@ -3215,3 +3285,1445 @@ def test_group_dimensions_classic(tmp_local_netcdf):
         with raises(CompatibilityError, match=r"Only one unlimited dimension allowed"):
             group.dimensions["z1"] = None
         assert list(group.dimensions) == ["y", "x", "z"]
+
+
+def test_repack(tmp_local_netcdf, tmp_path):
+    data = np.random.default_rng(0).random((7, 10, 8)).astype("f4")
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.attrs["title"] = "repack"
+        f.dimensions = {"time": None, "x": 10, "y": 8}
+        f.resize_dimension("time", 7)
+        enum_type = f.create_enumtype(np.uint8, "cloud", {"clear": 0, "cloudy": 1})
+        f.create_cmptype(np.dtype([("a", "i4"), ("b", "S3")]), "cmp")
+        t = f.create_variable("time", ("time",), "f8", chunks=(1,))
+        t[:] = np.arange(7)
+        t.attrs["units"] = "days"
+        v = f.create_variable("data", ("time", "x", "y"), "f4", chunks=(1, 2, 2))
+        v[:] = data
+        e = f.create_variable("cloud_mask", ("x",), enum_type, fillvalue=0)
+        e[:] = np.ones(10, dtype="u1")
+        g = f.create_group("sub")
+        g.dimensions["z"] = 3
+        g.create_variable("z", ("z",), "i4", data=[1, 2, 3])
+        g.create_variable("scalar", (), "i4", data=5)
+
+    out = str(tmp_path / "repacked.nc")
+    stats = h5netcdf.repack(
+        tmp_local_netcdf,
+        out,
+        chunks={"/sub/z": (3,), "cloud_mask": None},
+        dim_chunks={"time": 7, "x": 5},
+        compression="gzip",
+        memory_budget="1K",
+    )
+    assert stats["variables"] == 5
+    assert stats["nbytes"] >= data.nbytes
+    assert stats["throughput"] > 0
+
+    with h5netcdf.File(out, "r") as f:
+        assert f.attrs["title"] == "repack"
+        assert f.dimensions["time"].isunlimited()
+        assert f.dimensions["time"].size == 7
+        assert f["data"].dimensions == ("time", "x", "y")
+        assert f["data"].chunks == (7, 5, 2)
+        assert f["data"].compression == "gzip"
+        assert f["time"].chunks == (7,)
+        assert f["time"].attrs["units"] == "days"
+        # variable entries take precedence over dimension entries
+        assert f["cloud_mask"].chunks is None
+        np.testing.assert_array_equal(f["data"][:], data)
+        np.testing.assert_array_equal(f["time"][:], np.arange(7))
+        assert isinstance(f["cloud_mask"].datatype, h5netcdf.core.EnumType)
+        assert f["cloud_mask"].datatype.enum_dict == {"clear": 0, "cloudy": 1}
+        assert "cmp" in f.cmptypes
+        assert f["sub/z"].chunks == (3,)
+        np.testing.assert_array_equal(f["sub/z"][:], [1, 2, 3])
+        assert f["sub/scalar"][()] == 5
+
+
+def test_repack_cli(tmp_local_netcdf, tmp_path, capsys):
+    from h5netcdf.tools import repack_main
+
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 10, "y": 8}
+        v = f.create_variable(
+            "data", ("x", "y"), "f8", chunks=(1, 8), compression="gzip"
+        )
+        v[:] = np.arange(80).reshape(10, 8)
+
+    out = str(tmp_path / "repacked.nc")
+    assert (
+        repack_main([tmp_local_netcdf, out, "-d", "x=5", "--compression", "none"]) == 0
+    )
+    assert "MiB/s" in capsys.readouterr().out
+    with h5netcdf.File(out, "r") as f:
+        assert f["data"].chunks == (5, 8)
+        assert f["data"].compression is None
+        np.testing.assert_array_equal(f["data"][:], np.arange(80).reshape(10, 8))
+
+
+def test_aggregate(tmp_path, monkeypatch):
+    sources = tmp_path / "days"
+    sources.mkdir()
+    paths = []
+    for day in range(3):
+        path = sources / f"day{day}.nc"
+        paths.append(path)
+        with h5netcdf.File(path, "w") as f:
+            f.dimensions = {"time": None, "x": 4}
+            f.resize_dimension("time", 5)
+            f.attrs["title"] = "daily"
+            time = f.create_variable(
+                "time", ("time",), "f8", data=np.arange(5) + 5 * day
+            )
+            time.attrs["units"] = "hours since 2000-01-01"
+            f.create_variable("x", ("x",), "i4", data=np.arange(4))
+            v = f.create_variable("data", ("time", "x"), "f4", fillvalue=np.float32(-1))
+            # last day is shorter than its dimension
+            v[: 5 if day < 2 else 3] = day
+            g = f.create_group("sub")
+            g.create_variable("count", ("time",), "i8", data=np.arange(5))
+
+    out = tmp_path / "all.nc"
+    assert h5netcdf.aggregate(paths, out=out) == 15
+
+    # sources are found relative to the aggregate
+    monkeypatch.chdir(sources)
+    with h5netcdf.File(out, "r") as f:
+        assert f.dimensions["time"].size == 15
+        assert f.attrs["title"] == "daily"
+        assert f["time"].attrs["units"] == "hours since 2000-01-01"
+        assert f["data"]._h5ds.is_virtual
+        assert not f["x"]._h5ds.is_virtual
+        np.testing.assert_array_equal(f["time"][:], np.arange(15))
+        expected = np.repeat([0, 1, 2, -1], [5, 5, 3, 2]).astype("f4")
+        np.testing.assert_array_equal(f["data"][:, 2], expected)
+        assert f["data"].dimensions == ("time", "x")
+        np.testing.assert_array_equal(f["sub/count"][:], np.tile(np.arange(5), 3))
+
+    with h5netcdf.File(paths[1], "a") as f:
+        f.dimensions["y"] = 2
+        f.create_variable("extra", ("time", "y"), "f4")
+    with pytest.raises(ValueError, match="'/extra' is missing"):
+        h5netcdf.aggregate(paths[1:], out=out)
+    with pytest.raises(ValueError, match="no variable uses dimension 'y'"):
+        h5netcdf.aggregate(paths, out=out, dim="y")
+
+    # fixed dimensions have to match, even if only used by copied variables
+    with h5netcdf.File(paths[2], "a") as f:
+        f.dimensions["z"] = 3
+    with h5netcdf.File(paths[0], "a") as f:
+        f.dimensions["z"] = 2
+    with pytest.raises(ValueError, match="dimension '/z'"):
+        h5netcdf.aggregate([paths[0], paths[2]], out=out)
+
+    # virtual layouts can not be passed to create_variable
+    with h5netcdf.File(tmp_path / "other.nc", "w") as f:
+        f.dimensions = {"x": 4}
+        with pytest.raises(TypeError):
+            f.create_variable("v", ("x",), "f4", _virtual_layout=None)
+
+
+def test_read_into(tmp_local_netcdf):
+    from multiprocessing import shared_memory
+
+    data = np.arange(60, dtype="f4").reshape(5, 12)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 5, "y": 12}
+        f.create_variable("data", ("x", "y"), "f4", chunks=(2, 4), data=data)
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["data"]
+        out = np.empty((5, 12), dtype="f4")
+        assert v.read_into(out) is out
+        np.testing.assert_array_equal(out, data)
+
+        out = np.empty((3, 4), dtype="f4")
+        v.read_into(out, (slice(1, 4), slice(2, None, 3)))
+        np.testing.assert_array_equal(out, data[1:4, 2::3])
+
+        out = np.empty(12, dtype="f4")
+        v.read_into(out, -1)
+        np.testing.assert_array_equal(out, data[-1])
+
+        buf = bytearray(5 * 12 * 4)
+        res = v.read_into(buf)
+        np.testing.assert_array_equal(np.frombuffer(buf, dtype="f4"), data.ravel())
+        assert res.shape == (5, 12)
+
+        shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+        try:
+            res = v.read_into(shm.buf, (slice(None), slice(0, 6)))
+            np.testing.assert_array_equal(res, data[:, :6])
+            del res
+        finally:
+            shm.close()
+            shm.unlink()
+
+        with pytest.raises(ValueError, match="does not match selection shape"):
+            v.read_into(np.empty((5, 11), dtype="f4"))
+        with pytest.raises(TypeError, match="does not match variable dtype"):
+            v.read_into(np.empty((5, 12), dtype="f8"))
+        with pytest.raises(ValueError, match="C-contiguous"):
+            v.read_into(np.empty((12, 5), dtype="f4").T)
+        with pytest.raises(TypeError, match="only integers, slices"):
+            v.read_into(np.empty(2, dtype="f4"), ([0, 1], 0))
+        with pytest.raises(IndexError):
+            v.read_into(np.empty(12, dtype="f4"), 5)
+
+
+def test_read_into_padding(tmp_local_netcdf):
+    with legacyapi.Dataset(tmp_local_netcdf, "w") as ds:
+        ds.createDimension("time", None)
+        short = ds.createVariable("short", "i4", ("time",), fill_value=-1)
+        full = ds.createVariable("full", "i4", ("time",))
+        full[:] = np.arange(6)
+        short[:3] = np.arange(3)
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["short"]
+        out = np.zeros(6, dtype="i4")
+        v.read_into(out)
+        np.testing.assert_array_equal(out, [0, 1, 2, -1, -1, -1])
+        np.testing.assert_array_equal(out, v[:])
+
+        out = np.zeros(2, dtype="i4")
+        v.read_into(out, slice(4, None))
+        np.testing.assert_array_equal(out, [-1, -1])
+
+
+def _write_aio_file(path, **kwargs):
+    with h5netcdf.File(path, "w", **kwargs) as f:
+        f.dimensions = {"x": 4}
+        f.attrs["title"] = "aio"
+        for i in range(8):
+            v = f.create_variable(f"v{i}", ("x",), "i4", data=np.arange(4) + i)
+            v.attrs["index"] = i
+        g = f.create_group("sub")
+        g.create_variable("w", ("x",), "f8", data=np.ones(4))
+
+
+def test_aio(tmp_local_netcdf, monkeypatch):
+    import asyncio
+    import threading
+    import time
+
+    from h5netcdf.aio import AsyncFile
+
+    _write_aio_file(tmp_local_netcdf)
+
+    # inject latency into every variable read and count concurrent reads
+    getitem = h5netcdf.Variable.__getitem__
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def slow_getitem(self, key):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        try:
+            time.sleep(0.05)
+            return getitem(self, key)
+        finally:
+            with lock:
+                running["now"] -= 1
+
+    monkeypatch.setattr(h5netcdf.Variable, "__getitem__", slow_getitem)
+
+    async def main(max_concurrency):
+        async with AsyncFile(tmp_local_netcdf, max_concurrency=max_concurrency) as f:
+            assert not f.closed
+            names = await f.variables()
+            assert names == [f"v{i}" for i in range(8)]
+            assert await f.groups() == ["sub"]
+            assert await f.dimensions() == {"x": 4}
+            assert (await f.attrs())["title"] == "aio"
+            assert (await f.attrs("v3"))["index"] == 3
+            np.testing.assert_array_equal(await f.read("sub/w", slice(1, 3)), [1, 1])
+
+            running["peak"] = 0
+            arrays = await f.read_many(names)
+            for i, name in enumerate(names):
+                np.testing.assert_array_equal(arrays[name], np.arange(4) + i)
+        assert f.closed
+        assert f._executor is None
+        return running["peak"]
+
+    # not capped by the size of the default executor of the loop
+    assert asyncio.run(main(8)) == 8
+    assert asyncio.run(main(3)) == 3
+    assert asyncio.run(main(1)) == 1
+
+    with pytest.raises(ValueError, match="max_concurrency"):
+        AsyncFile(tmp_local_netcdf, max_concurrency=0)
+    with pytest.raises(ValueError, match="not open"):
+        AsyncFile(tmp_local_netcdf).file
+
+
+@requires_h5pyd
+def test_aio_h5pyd(tmp_remote_netcdf):
+    import asyncio
+
+    from h5netcdf.aio import AsyncFile
+
+    _write_aio_file(tmp_remote_netcdf, backend="h5pyd")
+
+    async def main():
+        async with AsyncFile(tmp_remote_netcdf, backend="h5pyd") as f:
+            names = await f.variables()
+            arrays, attrs = await asyncio.gather(
+                f.read_many(names), asyncio.gather(*(f.attrs(n) for n in names))
+            )
+        for i, name in enumerate(names):
+            np.testing.assert_array_equal(arrays[name], np.arange(4) + i)
+            assert attrs[i]["index"] == i
+
+    asyncio.run(main())
+
+
+@pytest.fixture
+def hsds_stand_in():
+    """Minimal HSDS-like server which serves empty domains."""
+    import json
+    import threading
+    from collections import Counter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    root = "g-00000000-0000-0000-0000-000000000000"
+    stats = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            stats["connections"] += 1
+            super().setup()
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            stats[path] += 1
+            if path == "/about":
+                body = {"state": "READY", "hsds_version": "0.9"}
+            elif path.startswith("/groups/"):
+                body = {"id": root, "root": root, "links": [], "attributes": []}
+                body.update(linkCount=0, attributeCount=0, hrefs=[])
+                body.update(created=0, lastModified=0)
+            else:
+                body = {"root": root, "owner": "test", "class": "domain"}
+                body.update(created=0, lastModified=0)
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", stats
+    server.shutdown()
+    server.server_close()
+
+
+@requires_h5pyd
+def test_session_pool(hsds_stand_in):
+    from h5netcdf.sessions import SessionPool
+
+    endpoint, stats = hsds_stand_in
+    for i in range(3):
+        with h5netcdf.File(
+            f"/home/test/d{i}.nc", "r", backend="h5pyd", endpoint=endpoint
+        ) as f:
+            assert f.backend == "h5pyd"
+    assert stats["connections"] == 3
+    assert stats["/about"] == 3
+
+    stats.clear()
+    kwargs = dict(backend="h5pyd", endpoint=endpoint)
+    with SessionPool(max_connections=2) as pool:
+        files = [
+            h5netcdf.File(f"/home/test/d{i}.nc", "r", session_pool=pool, **kwargs)
+            for i in range(5)
+        ]
+        assert pool.in_use == 5
+        for f in files:
+            f.close()
+        assert pool.in_use == 0
+        with h5netcdf.File("/home/test/d0.nc", "r", session_pool=pool, **kwargs):
+            assert pool.in_use == 1
+    # all opens share a single keep-alive connection and the server info
+    assert stats["connections"] == 1
+    assert stats["/about"] == 1
+    # h5pyd is left unchanged outside of pooled opens
+    assert all(
+        module.HttpConn.__name__ == "HttpConn"
+        for module in map(sys.modules.get, ("h5pyd.hsds_plugin", "h5pyd._hl.files"))
+        if module is not None and hasattr(module, "HttpConn")
+    )
+
+
+def test_session_pool_backend(tmp_local_netcdf):
+    from h5netcdf.sessions import SessionPool
+
+    with pytest.raises(ValueError, match="only supported by the 'h5pyd' backend"):
+        h5netcdf.File(tmp_local_netcdf, "w", session_pool=SessionPool())
+
+
+def test_session_pool_server_info():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from h5netcdf.sessions import SessionPool
+
+    calls = []
+
+    def fetch():
+        calls.append(None)
+        return {"state": "READY"}
+
+    pool = SessionPool()
+    with ThreadPoolExecutor(4) as executor:
+        infos = list(
+            executor.map(lambda _: pool.server_info("http://x", None, fetch), range(8))
+        )
+    assert infos == [{"state": "READY"}] * 8
+    assert len(calls) == 1
+
+
+@requires_pyfive
+def test_pyfive_chunk_workers(tmp_local_netcdf, monkeypatch):
+    data = np.arange(40 * 30, dtype="f8").reshape(40, 30)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 40, "y": 30}
+        f.create_variable(
+            "data", ("x", "y"), "f8", chunks=(8, 7), compression="gzip", data=data
+        )
+        # only the first chunk row is written
+        v = f.create_variable(
+            "sparse", ("x", "y"), "i4", chunks=(8, 7), compression="gzip", fillvalue=-1
+        )
+        v[:8] = 1
+
+    with h5netcdf.File(tmp_local_netcdf, "r", backend="pyfive", chunk_workers=3) as f:
+        v = f["data"]
+        for key in [
+            (),
+            Ellipsis,
+            5,
+            (slice(3, 35, 4), -2),
+            (slice(None), slice(5, 16)),
+            ([1, 17, 39], slice(None)),
+        ]:
+            np.testing.assert_array_equal(v[key], data[key])
+        expected = np.full((40, 30), -1, dtype="i4")
+        expected[:8] = 1
+        np.testing.assert_array_equal(f["sparse"][:], expected)
+        assert f._chunk_executor is not None
+    assert f._chunk_executor is None
+
+    # without the pyfive internals reads fall back to the serial path
+    from h5netcdf import parallel
+
+    monkeypatch.setattr(
+        parallel,
+        "_PYFIVE_DATASETID_ATTRS",
+        ("_renamed",) + parallel._PYFIVE_DATASETID_ATTRS,
+    )
+    with h5netcdf.File(tmp_local_netcdf, "r", backend="pyfive", chunk_workers=3) as f:
+        v = f["data"]
+        assert parallel.read_chunks_pyfive(v._h5ds, Ellipsis, f._executor) is None
+        np.testing.assert_array_equal(v[:], data)
+
+    with pytest.raises(ValueError, match="chunk_workers"):
+        h5netcdf.File(tmp_local_netcdf, "r", chunk_workers=0)
+
+
+def test_parallel_chunk_writes(tmp_local_netcdf):
+    import h5py
+
+    rng = np.random.default_rng(42)
+    data = rng.normal(size=(45, 33)).astype("f4")
+    filters = [
+        {"compression": "gzip", "compression_opts": 3, "shuffle": True},
+        {"compression": "gzip", "fletcher32": True},
+        {"fletcher32": True},
+        {"compression": "lzf"},
+    ]
+
+    def write(path, **kwargs):
+        with h5netcdf.File(path, "w", invalid_netcdf=True, **kwargs) as f:
+            f.dimensions = {"x": 45, "y": 33}
+            for i, options in enumerate(filters):
+                v = f.create_variable(
+                    f"v{i}", ("x", "y"), "f4", chunks=(10, 8), fillvalue=-1, **options
+                )
+                v[:] = data
+                # partially covered chunks keep their contents
+                v[3:17, 5] = 0
+                v[40] = np.arange(33)
+            v = f.create_variable("i2", ("x",), "i2", chunks=(7,), compression="gzip")
+            v[4:30] = 7
+
+    # invalid netcdf features, use the .h5 extension
+    serial = pathlib.Path(tmp_local_netcdf).with_name("serial.h5")
+    parallel = serial.with_name("parallel.h5")
+    write(serial)
+    write(parallel, chunk_workers=3)
+
+    with h5py.File(serial, "r") as a:
+        with h5py.File(parallel, "r") as b:
+            for name in [f"v{i}" for i in range(len(filters))] + ["i2"]:
+                # reading verifies fletcher32 checksums
+                np.testing.assert_array_equal(a[name][:], b[name][:])
+                assert a[name].id.get_num_chunks() == b[name].id.get_num_chunks()
+            # chunks are encoded exactly as HDF5 does
+            dsid = b["v0"].id
+            offset = (10, 8)
+            assert dsid.read_direct_chunk(offset) == a["v0"].id.read_direct_chunk(
+                offset
+            )
+
+    # value errors match those of h5py
+    with h5netcdf.File(parallel, "a", chunk_workers=3) as f:
+        with pytest.raises(TypeError, match="broadcast"):
+            f["v0"][:, 2] = np.arange(3)
+
+
+@pytest.mark.parametrize(
+    "backend", ["h5py", pytest.param("pyfive", marks=requires_pyfive)]
+)
+def test_as_memmap(tmp_local_netcdf, backend):
+    import h5py
+
+    data = np.arange(24, dtype=">f4").reshape(4, 6)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 4, "y": 6, "t": None}
+        f.create_variable("grid", ("x", "y"), data=data)
+        f.create_variable("scalar", (), "i8", data=42)
+        f.create_variable("packed", ("x", "y"), "f4", compression="gzip", data=data)
+        f.create_variable("chunked", ("x", "y"), "f4", chunks=(2, 3), data=data)
+        f.create_variable("empty", ("x",), "f8")
+        f.create_variable("series", ("t",), "f8")
+        v = f.create_variable("names", ("x",), h5py.string_dtype())
+        v[:] = np.array(list("abcd"), dtype=object)
+
+    with h5netcdf.File(tmp_local_netcdf, "r", backend=backend) as f:
+        m = f["grid"].as_memmap()
+        assert isinstance(m, np.memmap)
+        assert m.dtype == np.dtype(">f4")
+        assert not m.flags.writeable
+        np.testing.assert_array_equal(m, data)
+        assert f["scalar"].as_memmap() == 42
+        for name, match in [
+            ("packed", "filtered|contiguous"),
+            ("chunked", "contiguous"),
+            ("empty", "not allocated"),
+            ("series", "empty"),
+            ("names", "variable length"),
+        ]:
+            with pytest.raises(ValueError, match=match):
+                f[name].as_memmap()
+    # memmaps stay valid after closing the file
+    np.testing.assert_array_equal(m[1:3], data[1:3])
+
+    with h5netcdf.File(tmp_local_netcdf, "r", backend=backend, memmap=True) as f:
+        grid = f["grid"][1:, ::2]
+        assert isinstance(grid, np.memmap)
+        np.testing.assert_array_equal(grid, data[1:, ::2])
+        np.testing.assert_array_equal(f["packed"][:], data)
+        assert f["names"][0] in ("a", b"a")
+        assert f._memmaps["/packed"] is None
+        assert f._memmaps["/names"] is None
+
+
+def test_memmap_orthogonal_indexing(tmp_local_netcdf):
+    data = np.arange(20, dtype="f8").reshape(4, 5)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 4, "y": 5}
+        f.create_variable("g", ("x", "y"), "f8", data=data)
+
+    mask = np.array([True, False, True, True])
+    keys = [
+        ([0, 2], [1, 3]),
+        (mask, [0, 4]),
+        (1, [3, 0, 3]),
+        (slice(None, None, 2), [4, 1]),
+    ]
+    results = {}
+    for memmap in (False, True):
+        with h5netcdf.File(tmp_local_netcdf, "r", memmap=memmap) as f:
+            results[memmap] = [f["g"][key] for key in keys]
+            results[memmap].append(f["g"].lazy[[0, 2]][:, [1, 3]].values)
+    for expected, actual in zip(results[False], results[True]):
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(results[True][0], [[1, 3], [11, 13]])
+
+
+def test_memmap_mode(tmp_local_netcdf):
+    with legacyapi.Dataset(tmp_local_netcdf, "w") as ds:
+        ds.createDimension("time", None)
+        short = ds.createVariable("short", "i4", ("time",), fill_value=-1)
+        full = ds.createVariable("full", "i4", ("time",))
+        full[:] = np.arange(4)
+        short[:2] = np.arange(2)
+
+    with h5netcdf.File(tmp_local_netcdf, "r", memmap=True) as f:
+        # padded reads fall back to the regular path
+        np.testing.assert_array_equal(f["short"][:], [0, 1, -1, -1])
+        with pytest.raises(ValueError, match="padding"):
+            f["short"].as_memmap()
+
+    with pytest.raises(ValueError, match="only supported in read mode"):
+        h5netcdf.File(tmp_local_netcdf, "a", memmap=True)
+
+
+def test_chunk_cache(tmp_local_netcdf):
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"t": 10, "y": 2000, "x": 1000}
+        v = f.create_variable(
+            "data", ("t", "y", "x"), "f8", chunks=(1, 200, 100), chunk_cache="auto"
+        )
+        # one row of 10 x 10 chunks of 160 kB
+        cache = v.chunk_cache
+        assert cache["nbytes"] == 100 * 200 * 100 * 8
+        assert cache["w0"] == 0.75
+        assert cache["nslots"] >= 100 * 15
+        v[0] = 1.0
+        np.testing.assert_array_equal(v[0, :2, :2], 1.0)
+
+        f.create_variable(
+            "grid",
+            ("y", "x"),
+            "f4",
+            chunks=(10, 10),
+            chunk_cache={"nbytes": 2**22, "nslots": 1009},
+        )
+        assert f["grid"].chunk_cache == {"nbytes": 2**22, "nslots": 1009, "w0": 0.75}
+        with pytest.raises(ValueError, match="unknown chunk cache parameters"):
+            f.create_variable("bad", ("x",), "f4", chunk_cache={"size": 1})
+        with pytest.raises(TypeError, match="chunk cache needs to be"):
+            f.create_variable("bad", ("x",), "f4", chunk_cache=1)
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        default = f["data"].chunk_cache
+        assert default["nbytes"] < 100 * 200 * 100 * 8
+
+    with h5netcdf.File(
+        tmp_local_netcdf, "r", chunk_cache={"/data": "auto", "grid": {"w0": 0.5}}
+    ) as f:
+        assert f["data"].chunk_cache["nbytes"] == 100 * 200 * 100 * 8
+        assert f["grid"].chunk_cache == dict(default, w0=0.5)
+        np.testing.assert_array_equal(f["data"][0, 5], 1.0)
+        f["grid"].set_chunk_cache(nbytes=2**20, w0=0)
+        assert f["grid"].chunk_cache["w0"] == 0
+        with pytest.raises(ValueError, match="w0 needs to be between"):
+            f["grid"].set_chunk_cache(w0=2)
+
+    with legacyapi.Dataset(tmp_local_netcdf, "a") as ds:
+        v = ds.createVariable(
+            "legacy", "f4", ("t",), chunksizes=(5,), chunk_cache=2**21
+        )
+        assert v.get_var_chunk_cache()[0] == 2**21
+        v.set_var_chunk_cache(nelems=521, preemption=0.1)
+        assert ds["legacy"].get_var_chunk_cache() == (2**21, 521, 0.1)
+
+
+@requires_pyfive
+def test_chunk_cache_backend(tmp_local_netcdf):
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 4}
+        f.create_variable("data", ("x",), "f4", chunks=(2,))
+
+    with pytest.raises(ValueError, match="only supported by the 'h5py' backend"):
+        h5netcdf.File(
+            tmp_local_netcdf, "r", backend="pyfive", chunk_cache={"data": "auto"}
+        )
+    with h5netcdf.File(tmp_local_netcdf, "r", backend="pyfive") as f:
+        with pytest.raises(ValueError, match="not supported by the 'pyfive' backend"):
+            f["data"].set_chunk_cache(nbytes="auto")
+
+
+@pytest.mark.parametrize("chunks", [None, (16, 3, 5)])
+def test_coalesced_indexing(tmp_local_netcdf, chunks):
+    from h5netcdf.indexing import _blocks
+
+    data = np.arange(200 * 3 * 5, dtype="i4").reshape(200, 3, 5)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 200, "y": 3, "z": 5}
+        f.create_variable("data", ("x", "y", "z"), data=data, chunks=chunks)
+
+    mask = np.zeros(200, dtype=bool)
+    mask[[3, 4, 5, 100, 199]] = True
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["data"]
+        for key in [
+            [0, 1, 2, 50, 51, 199],
+            ([199, 3, 3, 150, -1],),
+            (mask, 1),
+            (slice(None, 100), [0, 2]),
+            (Ellipsis, np.array([4, 0])),
+            np.arange(0, 200, 2),
+            (np.array([0, 5, 10, 190]), slice(1, None), 2),
+        ]:
+            np.testing.assert_array_equal(v[key], data[key])
+        # orthogonal indexing
+        np.testing.assert_array_equal(v[7, :, [1, 3, 4]], data[7][:, [1, 3, 4]])
+        with pytest.raises(IndexError):
+            v[[0, 200]]
+
+    # sparse runs stay separate blocks, dense selections are read at once
+    starts, stops = _blocks(np.array([0, 1, 2, 500, 501, 1000]), max_gap=10)
+    assert starts.tolist() == [0, 500, 1000] and stops.tolist() == [3, 502, 1001]
+    starts, stops = _blocks(np.array([0, 1, 2, 5, 500]), max_gap=1000)
+    assert starts.tolist() == [0] and stops.tolist() == [501]
+    starts, stops = _blocks(np.arange(0, 100, 2), max_gap=0)
+    assert starts.tolist() == [0] and stops.tolist() == [99]
+    # runs within the same chunk are merged
+    starts, stops = _blocks(np.array([0, 10, 20, 35, 300]), max_gap=0, chunk=32)
+    assert starts.tolist() == [0, 35, 300] and stops.tolist() == [21, 36, 301]
+
+
+def test_orthogonal_indexing_padding(tmp_local_netcdf):
+    with legacyapi.Dataset(tmp_local_netcdf, "w") as ds:
+        ds.createDimension("time", None)
+        ds.createDimension("x", 4)
+        short = ds.createVariable("short", "i4", ("time", "x"), fill_value=-1)
+        full = ds.createVariable("full", "i4", ("time",))
+        full[:] = np.arange(6)
+        short[:3] = np.arange(12).reshape(3, 4)
+
+    expected = np.full((6, 4), -1)
+    expected[:3] = np.arange(12).reshape(3, 4)
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["short"]
+        assert v._get_padding(...)
+        np.testing.assert_array_equal(
+            v[[0, 4], [1, 3]], expected[np.ix_([0, 4], [1, 3])]
+        )
+        np.testing.assert_array_equal(
+            v[[1, 2, 5], [0, 2]], expected[[1, 2, 5]][:, [0, 2]]
+        )
+        np.testing.assert_array_equal(v[2:, [3, 0]], expected[2:, [3, 0]])
+
+
+@pytest.mark.parametrize("chunks", [None, (4, 8, 16)])
+def test_orthogonal_indexing(tmp_local_netcdf, monkeypatch, chunks):
+    from h5netcdf import indexing
+
+    data = np.arange(10 * 40 * 60, dtype="f8").reshape(10, 40, 60)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"t": 10, "y": 40, "x": 60}
+        f.create_variable("data", ("t", "y", "x"), data=data, chunks=chunks)
+
+    ys = [39, 0, 17, 17, 5]
+    xs = np.array([3, 59, 30, 31, 32, 0])
+    mask = np.arange(10) % 3 == 0
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["data"]
+        np.testing.assert_array_equal(v[:, ys, xs], data[:, ys][:, :, xs])
+        np.testing.assert_array_equal(v[mask, ys, xs], data[np.ix_(mask, ys, xs)])
+        np.testing.assert_array_equal(v[2, ys, xs], data[2][np.ix_(ys, xs)])
+        np.testing.assert_array_equal(v[mask, 5, xs], data[mask][:, 5][:, xs])
+        np.testing.assert_array_equal(v[mask, 1:30:7, xs], data[mask, 1:30:7][..., xs])
+
+        # the number of reads is bounded by merging blocks
+        monkeypatch.setattr(indexing, "MAX_BLOCKS", 4)
+        monkeypatch.setattr(indexing, "MERGE_GAP_BYTES", 0)
+        reads = []
+        getitem = type(v._h5ds).__getitem__
+        monkeypatch.setattr(
+            type(v._h5ds),
+            "__getitem__",
+            lambda self, key: reads.append(key) or getitem(self, key),
+        )
+        sparse = [0, 20, 39]
+        np.testing.assert_array_equal(
+            v[:, sparse, [0, 30, 59]], data[:, sparse][:, :, [0, 30, 59]]
+        )
+        assert len(reads) <= 4
+
+
+@pytest.mark.skipif(
+    version.parse(np.__version__) < version.parse("2.0"), reason="needs numpy>=2"
+)
+@pytest.mark.parametrize(
+    "backend", ["h5py", pytest.param("pyfive", marks=requires_pyfive)]
+)
+def test_decode_vlen_strings_stringdtype(tmp_local_netcdf, backend):
+    import h5py
+
+    names = np.array(["station_1", "ünïcode", "", "x" * 40], dtype=object)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 4}
+        v = f.create_variable("names", ("x",), h5py.string_dtype())
+        v[:] = names
+        f.create_variable(
+            "scalar", (), h5py.string_dtype(), data=np.array("scalar", dtype=object)
+        )
+        f.create_variable("data", ("x",), "i4", data=np.arange(4))
+
+    with h5netcdf.File(
+        tmp_local_netcdf, "r", backend=backend, decode_vlen_strings="StringDType"
+    ) as f:
+        data = f["names"][:]
+        assert data.dtype == np.dtypes.StringDType()
+        np.testing.assert_array_equal(data, names.astype(str))
+        np.testing.assert_array_equal(f["names"][[0, 3]], names[[0, 3]].astype(str))
+        assert f["names"][1] == "ünïcode"
+        assert f["scalar"][()] == "scalar"
+        assert f["data"][:].dtype == np.dtype("i4")
+
+    with pytest.raises(ValueError, match="decode_vlen_strings needs to be"):
+        h5netcdf.File(tmp_local_netcdf, "r", decode_vlen_strings="object")
+
+
+def test_read_decode_cf(tmp_local_netcdf):
+    raw = np.arange(-50, 50, dtype="i2").reshape(10, 10)
+    raw[::3, 1] = -99
+    expected = (raw * np.float32(0.5) + np.float32(10)).astype("f4")
+    expected[(raw == -99) | (raw > 45)] = np.nan
+
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 10, "y": 10}
+        v = f.create_variable("packed", ("x", "y"), "i2", chunks=(3, 10), fillvalue=-99)
+        v[:] = raw
+        v.attrs["scale_factor"] = np.float32(0.5)
+        v.attrs["add_offset"] = np.float32(10)
+        v.attrs["valid_max"] = np.int16(45)
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["packed"]
+        np.testing.assert_array_equal(v.read(), raw)
+        data = v.read(decode_cf=True)
+        assert data.dtype == np.float32
+        np.testing.assert_array_equal(data, expected)
+        np.testing.assert_array_equal(
+            v.read((slice(1, 9, 2), 1), decode_cf=True), expected[1:9:2, 1]
+        )
+        np.testing.assert_array_equal(
+            v.read(([4, 0, 7], slice(None)), decode_cf=True), expected[[4, 0, 7]]
+        )
+        assert v.read((2, 3), decode_cf=True) == expected[2, 3]
+        out = np.empty((10, 10), dtype="f8")
+        assert v.read(decode_cf=True, out=out) is out
+        np.testing.assert_array_equal(out, expected.astype("f8"))
+        with pytest.raises(ValueError, match="masked values"):
+            v.read(decode_cf=True, out_dtype="i4")
+
+    # cached parameters are updated on attribute changes
+    with h5netcdf.File(tmp_local_netcdf, "a") as f:
+        v = f["packed"]
+        v.read(decode_cf=True)
+        del v.attrs["valid_max"]
+        v.attrs["add_offset"] = np.float32(0)
+        expected = (raw * np.float32(0.5)).astype("f4")
+        expected[raw == -99] = np.nan
+        np.testing.assert_array_equal(v.read(decode_cf=True), expected)
+
+
+def test_legacyapi_auto_maskandscale(tmp_local_netcdf):
+    with legacyapi.Dataset(tmp_local_netcdf, "w") as ds:
+        ds.createDimension("x", None)
+        v = ds.createVariable("v", "i2", ("x",), fill_value=-1)
+        v[:] = np.array([-1, 10, 20], dtype="i2")
+        v.scale_factor = np.float32(0.1)
+        g = ds.createGroup("g")
+        g.createVariable("w", "i4", ("x",), fill_value=-1)[:2] = [1, 2]
+
+    with legacyapi.Dataset(tmp_local_netcdf, "r") as ds:
+        np.testing.assert_array_equal(ds["v"][:], [-1, 10, 20])
+        ds.set_auto_maskandscale(True)
+        data = ds["v"][:]
+        assert isinstance(data, np.ma.MaskedArray)
+        assert data.dtype == np.float32
+        np.testing.assert_array_equal(data.mask, [True, False, False])
+        np.testing.assert_allclose(data[1:], [1.0, 2.0])
+        # padded values are masked in subgroups as well
+        data = ds["g/w"][:]
+        assert data.dtype == np.int32
+        np.testing.assert_array_equal(data.mask, [False, False, True])
+
+        ds["v"].set_auto_scale(False)
+        data = ds["v"][:]
+        assert data.dtype == np.int16
+        np.testing.assert_array_equal(data.mask, [True, False, False])
+        ds["v"].set_auto_mask(False)
+        assert not isinstance(ds["v"][:], np.ma.MaskedArray)
+        assert "_auto_mask" not in ds["v"].ncattrs()
+
+
+def test_decode_cf_scalar(tmp_local_netcdf):
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        v = f.create_variable("scaled", (), "i2", data=np.int16(4))
+        v.attrs["scale_factor"] = np.float32(0.5)
+        f.create_variable("missing", (), "i2", data=np.int16(-9), fillvalue=-9)
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        value = f["scaled"].read(decode_cf=True)
+        assert value == 2.0
+        assert value.dtype == np.float32
+        assert np.isnan(f["missing"].read(decode_cf=True))
+
+    with legacyapi.Dataset(tmp_local_netcdf, "r") as ds:
+        ds.set_auto_maskandscale(True)
+        assert ds["scaled"][...] == 2.0
+        assert ds["missing"][...] is np.ma.masked
+
+
+def test_chunk_stats_index(tmp_local_netcdf):
+    data = np.arange(40 * 6, dtype="f4").reshape(40, 6) % 50 + 1
+    data[25, 4] = 500
+
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": None, "x": 6}
+        v = f.create_variable(
+            "pr", ("time", "x"), "f4", chunks=(10, 3), fillvalue=-1.0, chunk_stats=True
+        )
+        assert v.chunk_stats["count"].shape == (0, 2)
+        f.resize_dimension("time", 40)
+        v[:] = data
+        # statistics are updated on write
+        v[35:, :] = -1.0
+        v[0, 0] = np.nan
+        f.create_variable("plain", ("x",), "i4", data=np.arange(6))
+        assert f["plain"].chunk_stats is None
+        with pytest.raises(ValueError, match="chunked variable"):
+            f["plain"].build_stats_index()
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["pr"]
+        stats = v.chunk_stats
+        assert list(v.attrs) == ["_FillValue"]
+        assert "_h5netcdf_chunk_stats_pr" not in f.variables
+        np.testing.assert_array_equal(
+            stats["count"], [[29, 30], [30, 30], [30, 30], [15, 15]]
+        )
+        assert stats["max"][2, 1] == 500
+        assert stats["min"][0, 0] == 1
+        assert v.where_chunks(lambda mn, mx: mx > 100) == [(slice(20, 30), slice(3, 6))]
+        assert len(v.where_chunks(lambda mn, mx: True)) == 8
+        with pytest.raises(ValueError, match="no chunk statistics"):
+            f["plain"].where_chunks(lambda mn, mx: mx > 0)
+
+    # build explicitly for existing variables
+    with legacyapi.Dataset(tmp_local_netcdf, "a") as ds:
+        v = ds.createVariable("t", "i2", ("time",), chunksizes=(16,))
+        v[:] = np.arange(40)
+        v.build_stats_index()
+        v[40:48] = 100
+        assert v.where_chunks(lambda mn, mx: mx >= 100) == [(slice(32, 48),)]
+
+    if has_netCDF4:
+        import netCDF4
+
+        # the statistics are invisible to netCDF-C
+        with netCDF4.Dataset(tmp_local_netcdf, "r") as ds:
+            assert set(ds.variables) == {"pr", "plain", "t"}
+            assert ds["pr"].ncattrs() == ["_FillValue"]
+
+    with h5netcdf.File(tmp_local_netcdf, "w", format="NETCDF4_CLASSIC") as f:
+        f.dimensions = {"x": 6}
+        with pytest.raises(ValueError, match="NETCDF4_CLASSIC"):
+            f.create_variable("pr", ("x",), "f4", chunks=(3,), chunk_stats=True)
+        assert "pr" not in f
+
+
+@requires_h5py
+@pytest.mark.parametrize(
+    "backend", ["h5py", pytest.param("pyfive", marks=requires_pyfive)]
+)
+def test_chunk_index_references(tmp_local_netcdf, backend):
+    import base64
+    import json
+    import zlib
+
+    import h5py
+
+    data = np.arange(60, dtype="<f4").reshape(6, 10)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 6, "y": 10}
+        f.attrs["title"] = "refs"
+        v = f.create_variable(
+            "data",
+            ("x", "y"),
+            "<f4",
+            chunks=(4, 5),
+            compression="gzip",
+            shuffle=True,
+            data=data,
+        )
+        v.attrs["units"] = "K"
+        f.create_variable("plain", ("y",), "<i4", data=np.arange(10), fillvalue=-1)
+        f.create_variable("scalar", (), "<f8", data=2.5)
+        f.create_variable("codes", ("x",), "S3", fillvalue=b"ab")
+        f.create_variable("names", ("x",), h5py.string_dtype())
+        g = f.create_group("sub")
+        g.create_variable("count", ("y",), "<i8", data=np.arange(10))
+
+    with h5netcdf.File(tmp_local_netcdf, "r", backend=backend) as f:
+        index = f["data"].chunk_index()
+        assert index["chunk"].tolist() == [[0, 0], [0, 1], [1, 0], [1, 1]]
+        assert index["offset"].dtype == np.uint64
+        assert not index["filter_mask"].any()
+        plain = f["plain"].chunk_index()
+        assert plain["chunk"].shape == (1, 1)
+        assert plain["size"].tolist() == [40]
+
+    json_path = tmp_local_netcdf + ".json"
+    with h5netcdf.File(tmp_local_netcdf, "r", backend=backend) as f:
+        with pytest.warns(UserWarning, match="/names"):
+            spec = f.export_references(path=json_path, url="data.nc")
+    with open(json_path) as fh:
+        assert json.load(fh) == spec
+
+    refs = spec["refs"]
+    assert spec["version"] == 1
+    assert json.loads(refs[".zattrs"]) == {"title": "refs"}
+    assert "names/.zarray" not in refs
+    zarray = json.loads(refs["data/.zarray"])
+    assert zarray["chunks"] == [4, 5]
+    assert zarray["dtype"] == "<f4"
+    assert [codec["id"] for codec in zarray["filters"]] == ["shuffle", "zlib"]
+    zattrs = json.loads(refs["data/.zattrs"])
+    assert zattrs == {"units": "K", "_ARRAY_DIMENSIONS": ["x", "y"]}
+    assert json.loads(refs["sub/count/.zattrs"])["_ARRAY_DIMENSIONS"] == ["y"]
+    # the fill value is only stored in .zarray, base64 encoded for bytes
+    assert json.loads(refs["plain/.zattrs"]) == {"_ARRAY_DIMENSIONS": ["y"]}
+    assert json.loads(refs["plain/.zarray"])["fill_value"] == -1
+    zarray = json.loads(refs["codes/.zarray"])
+    assert zarray["dtype"] == "|S3"
+    assert base64.b64decode(zarray["fill_value"]) == b"ab\x00"
+    # compact storage is inlined
+    scalar = refs["scalar/0"]
+    assert scalar.startswith("base64:")
+    assert np.frombuffer(base64.b64decode(scalar[7:]), dtype="<f8")[0] == 2.5
+
+    def fetch(key):
+        url, offset, size = refs[key]
+        with open(tmp_local_netcdf, "rb") as fh:
+            fh.seek(offset)
+            return fh.read(size)
+
+    # decode chunk (1, 1) without HDF5: inflate and unshuffle
+    raw = np.frombuffer(zlib.decompress(fetch("data/1.1")), dtype="u1")
+    chunk = raw.reshape(4, -1).T.copy().view("<f4").reshape(4, 5)
+    np.testing.assert_array_equal(chunk[:2], data[4:, 5:])
+    np.testing.assert_array_equal(
+        np.frombuffer(fetch("plain/0"), dtype="<i4"), np.arange(10)
+    )
+    np.testing.assert_array_equal(
+        np.frombuffer(fetch("sub/count/0"), dtype="<i8"), np.arange(10)
+    )
+
+
+def test_iter_along(tmp_local_netcdf):
+    data = np.arange(7 * 4 * 5, dtype="f4").reshape(7, 4, 5)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": None, "y": 4, "x": 5}
+        f.resize_dimension("time", 7)
+        v = f.create_variable("data", ("time", "y", "x"), "f4", chunks=(3, 4, 5))
+        v[:] = data
+        f.create_variable("plain", ("y", "x"), "f4", data=data[0])
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        v = f["data"]
+        steps = list(v.iter_along("time", prefetch=1))
+        assert len(steps) == 7
+        for t, step in enumerate(steps):
+            np.testing.assert_array_equal(step, data[t])
+        # slabs are shrunk to a divisor of the chunk size to bound memory
+        steps = list(v.iter_along("x", prefetch=3, max_bytes=4 * 28 * 4))
+        np.testing.assert_array_equal(np.stack(steps, axis=-1), data)
+        steps = list(f["plain"].iter_along(-1))
+        np.testing.assert_array_equal(np.stack(steps, axis=-1), data[0])
+
+        # stopping early cancels the read-ahead
+        it = v.iter_along("time", prefetch=2)
+        np.testing.assert_array_equal(next(it), data[0])
+        it.close()
+
+        with pytest.raises(ValueError, match="has no dimension 'z'"):
+            v.iter_along("z")
+        with pytest.raises(ValueError, match="out of bounds"):
+            v.iter_along(3)
+        with pytest.raises(ValueError, match="prefetch"):
+            v.iter_along("time", prefetch=0)
+
+    with legacyapi.Dataset(tmp_local_netcdf, "a") as ds:
+        v = ds["data"]
+        v.setncattr("_FillValue", np.float32(0))
+        v.set_auto_mask(True)
+        first = next(v.iter_along("time"))
+        assert np.ma.is_masked(first)
+        assert first.mask[0, 0]
+
+
+@requires_pyfive
+def test_iter_along_pyfive(tmp_local_netcdf, monkeypatch):
+    import threading
+
+    data = np.arange(7 * 4, dtype="f4").reshape(7, 4)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": 7, "x": 4}
+        f.create_variable("data", ("time", "x"), "f4", chunks=(2, 4), data=data)
+
+    with h5netcdf.File(tmp_local_netcdf, "r", backend="pyfive") as f:
+        v = f["data"]
+        threads = set()
+        getitem = type(v).__getitem__
+        monkeypatch.setattr(
+            type(v),
+            "__getitem__",
+            lambda self, key: threads.add(threading.current_thread())
+            or getitem(self, key),
+        )
+        # pyfive handles are not shared with a read-ahead thread
+        steps = list(v.iter_along("time", prefetch=2))
+        np.testing.assert_array_equal(np.stack(steps), data)
+        assert threads == {threading.current_thread()}
+
+
+@pytest.mark.parametrize(
+    "backend", ["h5py", pytest.param("pyfive", marks=requires_pyfive)]
+)
+def test_lazy_indexing(tmp_local_netcdf, backend):
+    data = np.arange(10 * 8 * 6, dtype="i4").reshape(10, 8, 6)
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": 10, "y": 8, "x": 6}
+        f.create_variable("data", ("time", "y", "x"), "i4", chunks=(2, 4, 3), data=data)
+
+    with h5netcdf.File(tmp_local_netcdf, "r", backend=backend) as f:
+        v = f["data"]
+        box = v.lazy[1:9, 2:7]
+        assert box.shape == (8, 5, 6)
+        assert box.dimensions == ("time", "y", "x")
+        strided = box[::3, :, -1]
+        assert strided.shape == (3, 5)
+        assert strided.dimensions == ("time", "y")
+        points = strided[:, [4, 0, 0]]
+        # composed into one selection of the variable
+        time, y, x = points.key
+        assert (time, x) == (slice(1, 10, 3), 5)
+        np.testing.assert_array_equal(y, [6, 2, 2])
+        np.testing.assert_array_equal(
+            points.values, data[1:9, 2:7][::3, :, -1][:, [4, 0, 0]]
+        )
+        np.testing.assert_array_equal(np.asarray(points), points.values)
+
+        reverse = v.lazy[::-2][1:, [True, False] * 4]
+        np.testing.assert_array_equal(
+            np.asarray(reverse), data[::-2][1:][:, [True, False] * 4]
+        )
+        assert v.lazy[3][-1, 2].shape == ()
+        assert v.lazy[3][-1, 2].values == data[3, -1, 2]
+        assert len(v.lazy[..., 0]) == 10
+        assert repr(box).startswith("<h5netcdf.LazyArray '/data': dimensions")
+
+        with pytest.raises(IndexError, match="out of bounds"):
+            box[8]
+        with pytest.raises(IndexError, match="out of range"):
+            box[:, [5]]
+        with pytest.raises(IndexError, match="unsupported index"):
+            box[None]
+
+
+def test_repr_max_items(tmp_local_netcdf):
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {f"d{i}": i + 1 for i in range(8)}
+        for i in range(8):
+            f.create_variable(f"v{i}", (f"d{i}",), "f4")
+            f.create_group(f"g{i}")
+            f.attrs[f"a{i}"] = i
+            f["v0"].attrs[f"a{i}"] = i
+
+    with h5netcdf.File(tmp_local_netcdf, "r", repr_max_items=3) as f:
+        text = repr(f)
+        assert text.count("... (5 more)") == 4
+        assert "v2: ('d2',) float32" in text
+        assert "v3" not in text
+        assert "d2: <h5netcdf.Dimension 'd2': size 3>" in text
+        assert "d3" not in text
+        assert "a2:" in text and "a3:" not in text
+        assert repr(f["v0"]).count("... (5 more)") == 1
+
+        html = f._repr_html_()
+        assert html.startswith("<div><strong>&lt;h5netcdf.File")
+        assert "<summary>Variables (8)</summary>" in html
+        assert "<code>v2: (&#x27;d2&#x27;,) float32</code>" in html
+        assert "v3" not in html
+        assert "<summary>Groups (0)</summary><ul></ul>" in f["g0"]._repr_html_()
+
+    with h5netcdf.File(tmp_local_netcdf, "r", repr_max_items=None) as f:
+        assert "v7: ('d7',) float32" in repr(f)
+        assert "more)" not in repr(f)
+    assert "Closed" in f._repr_html_()
+
+
+def test_dimid_index(tmp_local_netcdf, monkeypatch):
+    from h5netcdf.dimensions import Dimension
+
+    # 2D coordinate variables are resolved through _Netcdf4Coordinates
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"strlen": 4}
+        f.dimensions.update({f"d{i}": i + 1 for i in range(6)})
+        for i in range(6):
+            f.create_variable(f"d{i}", (f"d{i}", "strlen"), "S1")
+        g = f.create_group("sub")
+        g.dimensions = {"y": 2, "n": 3}
+        g.create_variable("y", ("y", "n"), "S1")
+
+    calls = []
+    dimid = Dimension._dimid
+
+    def counting_dimid(self):
+        calls.append(self.name)
+        return dimid.fget(self)
+
+    monkeypatch.setattr(Dimension, "_dimid", property(counting_dimid))
+    with h5netcdf.File(tmp_local_netcdf, "a") as f:
+        for i in range(6):
+            assert f[f"d{i}"].dimensions == (f"d{i}", "strlen")
+        assert f["sub/y"].dimensions == ("y", "n")
+        # the ids are read once per dimension
+        expected = [f"d{i}" for i in range(6)] + ["strlen", "y", "n"]
+        assert sorted(calls) == sorted(expected)
+
+        index = f._dimensions._dimid_index()
+        assert sorted(index.values()) == [f"d{i}" for i in range(6)] + ["strlen"]
+        f.dimensions["new"] = 3
+        assert index[f.dimensions["new"]._dimid] == "new"
+        assert f["sub"]._all_dimids[f.dimensions["new"]._dimid] == "new"
+
+
+@requires_h5py
+def test_phony_dims_size_index(tmp_local_netcdf, monkeypatch):
+    import h5py
+
+    from h5netcdf.dimensions import Dimension
+
+    with h5py.File(tmp_local_netcdf, "w") as f:
+        for i in range(20):
+            f.create_dataset(f"var{i}", data=np.zeros((3, 4, 3), dtype="i2"))
+        f.create_dataset("other", data=np.zeros(5))
+
+    sizes = []
+    size = Dimension.size
+
+    def counting_size(self):
+        sizes.append(self.name)
+        return size.fget(self)
+
+    monkeypatch.setattr(Dimension, "size", property(counting_size))
+    for mode in ["sort", "access"]:
+        sizes.clear()
+        with h5netcdf.File(tmp_local_netcdf, "r", phony_dims=mode) as f:
+            for i in range(20):
+                dims = f[f"var{i}"].dimensions
+                assert dims[0] != dims[2]
+                assert dims == f["var0"].dimensions
+            assert len(f["other"].dimensions) == 1
+            # sizes are read once per dimension
+            assert len(sizes) == len(f.dimensions) == 4
+
+    # unlimited dimensions grown by writing update the index
+    monkeypatch.undo()
+    with legacyapi.Dataset(tmp_local_netcdf, "w") as ds:
+        ds.createDimension("time", None)
+        ds.createDimension("x", 2)
+        v = ds.createVariable("v", "i4", ("time",))
+        assert ds._dimensions._names_by_size() == {0: ["time"], 2: ["x"]}
+        v[:3] = np.arange(3)
+        assert ds._dimensions._names_by_size() == {3: ["time"], 2: ["x"]}
+        ds.resize_dimension("time", 5)
+        assert ds._dimensions._names_by_size() == {5: ["time"], 2: ["x"]}
+
+
+@requires_h5py
+@pytest.mark.parametrize("mode", ["r", "a"])
+def test_phony_dims_sort_lazy_groups(tmp_local_netcdf, mode):
+    import h5py
+
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"x": 3, "time": None}
+        f.create_variable("x", ("x",), "f4")
+    with h5py.File(tmp_local_netcdf, "a") as f:
+        f.create_dataset("root_data", data=np.zeros((3, 4)))
+        for name in ["a", "b"]:
+            g = f.create_group(name)
+            g.create_dataset("data", data=np.zeros((2, 4, 4)))
+            g.create_group("inner").create_dataset("data", data=np.zeros(6))
+
+    def dimensions(f):
+        return {
+            path: f[path].dimensions
+            for path in ["b/inner/data", "b/data", "a/inner/data", "a/data"]
+        }
+
+    with h5netcdf.File(tmp_local_netcdf, mode, phony_dims="sort") as f:
+        # groups are not created on open
+        assert all(group is None for group in f._groups._objects.values())
+        assert f["root_data"].dimensions == ("x", "phony_dim_2")
+        # groups are accessed in reverse order
+        dims = dimensions(f)
+
+    # same names as when creating all groups on open
+    assert dims == {
+        "a/data": ("phony_dim_3", "phony_dim_4", "phony_dim_5"),
+        "a/inner/data": ("phony_dim_6",),
+        "b/data": ("phony_dim_7", "phony_dim_8", "phony_dim_9"),
+        "b/inner/data": ("phony_dim_10",),
+    }
+
+
+@requires_h5py
+def test_resize_dimensions(tmp_local_netcdf, monkeypatch):
+    import h5py
+
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": None, "ensemble": None, "x": 3}
+        for i in range(4):
+            f.create_variable(f"v{i}", ("time", "ensemble", "x"), "f4")
+        f.create_variable("t", ("time",), "f8")
+        f.create_variable("e", ("ensemble", "x"), "i4")
+
+        resized = []
+        resize = h5py.Dataset.resize
+
+        def counting_resize(self, size, axis=None):
+            resized.append(self.name)
+            return resize(self, size, axis=axis)
+
+        monkeypatch.setattr(h5py.Dataset, "resize", counting_resize)
+        f.resize_dimensions({"time": 5, "ensemble": 2})
+        # each dataset is resized once
+        assert sorted(resized) == sorted(
+            ["/time", "/ensemble", "/t", "/e"] + [f"/v{i}" for i in range(4)]
+        )
+        assert f["v0"].shape == (5, 2, 3)
+        assert f["t"].shape == (5,)
+        assert f["e"].shape == (2, 3)
+        assert f.dimensions["time"].size == 5
+
+        with pytest.raises(ValueError, match="not unlimited"):
+            f.resize_dimensions({"time": 6, "x": 4})
+        assert f.dimensions["time"].size == 5
+        with pytest.raises(KeyError):
+            f.resize_dimensions({"y": 2})
+
+
+@pytest.mark.parametrize("policy", ["chunks", "geometric"])
+def test_growth_policy(tmp_local_netcdf, monkeypatch, policy):
+    import h5py
+
+    resized = []
+    resize = h5py.Dataset.resize
+
+    def counting_resize(self, size, axis=None):
+        resized.append(self.name)
+        return resize(self, size, axis=axis)
+
+    monkeypatch.setattr(h5py.Dataset, "resize", counting_resize)
+    with legacyapi.Dataset(tmp_local_netcdf, "w", growth_policy=policy) as ds:
+        ds.createDimension("time", None)
+        ds.createDimension("x", 3)
+        v = ds.createVariable("v", "f4", ("time", "x"), chunksizes=(8, 3))
+        t = ds.createVariable("time", "f8", ("time",))
+        for i in range(100):
+            v[i] = np.full(3, i)
+            t[i] = i
+            assert len(ds.dimensions["time"]) == i + 1
+            assert v.shape == (i + 1, 3)
+        assert ds._h5file["v"].shape[0] > 100
+        np.testing.assert_array_equal(t[:], np.arange(100))
+        np.testing.assert_array_equal(v[-1], [99, 99, 99])
+        np.testing.assert_array_equal(
+            v[95:], np.repeat(np.arange(95, 100), 3).reshape(5, 3)
+        )
+        # arrays and indices are limited to the logical shape
+        assert np.asarray(v).shape == (100, 3)
+        assert np.asarray(t).shape == (100,)
+        with pytest.raises(IndexError):
+            v[100]
+        with pytest.raises(IndexError):
+            t[[0, 101]]
+        # overwriting does not grow
+        v[:] = np.zeros((100, 3))
+        assert v.shape == (100, 3)
+        assert len(resized) < 40
+
+        # sync trims the extents on disk
+        ds.sync()
+        assert ds._h5file["v"].shape == (100, 3)
+        v[100] = np.zeros(3)
+        t[100] = 100
+        assert v.shape == (101, 3)
+        assert ds._h5file["v"].shape[0] > 101
+
+    with h5py.File(tmp_local_netcdf, "r") as f:
+        assert f["v"].shape == (101, 3)
+        assert f["time"].shape == (101,)
+
+    with legacyapi.Dataset(tmp_local_netcdf, "r") as ds:
+        assert ds.variables["v"].shape == (101, 3)
+        assert ds.variables["v"][:].sum() == 0
+
+
+def test_growth_policy_invalid(tmp_local_netcdf):
+    with pytest.raises(ValueError, match="growth_policy needs to be one of"):
+        legacyapi.Dataset(tmp_local_netcdf, "w", growth_policy="double")
+    with pytest.raises(ValueError, match="only supported by the legacy API"):
+        h5netcdf.File(tmp_local_netcdf, "w", growth_policy="chunks")
+
+
+@requires_h5py
+def test_swmr(tmp_local_netcdf):
+    with h5netcdf.File(tmp_local_netcdf, "w", libver="latest") as f:
+        f.dimensions = {"time": None, "x": 2}
+        f.create_variable("time", ("time",), "f8")
+        f.create_variable("v", ("time", "x"), "f4")
+
+    writer = h5netcdf.File(tmp_local_netcdf, "a", swmr=True)
+    assert writer._h5file.swmr_mode
+    reader = h5netcdf.File(tmp_local_netcdf, "r", swmr=True)
+    assert reader.dimensions["time"].size == 0
+    for n in (3, 7):
+        writer.resize_dimension("time", n)
+        writer["time"][:] = np.arange(n)
+        writer["v"][:] = np.ones((n, 2))
+        writer.refresh()
+        reader.refresh()
+        assert reader.dimensions["time"].size == n
+        assert reader["v"].shape == (n, 2)
+        np.testing.assert_array_equal(reader["time"][:], np.arange(n))
+    reader.close()
+    writer.close()
+
+    with h5netcdf.File(tmp_local_netcdf, "r") as f:
+        assert f["v"].shape == (7, 2)
+        with pytest.raises(ValueError, match="swmr=True"):
+            f.refresh()
+
+
+@requires_h5py
+def test_swmr_invalid(tmp_local_netcdf):
+    with pytest.raises(ValueError, match="needs mode"):
+        h5netcdf.File(tmp_local_netcdf, "w", swmr=True)
+    with pytest.raises(ValueError, match="needs an existing file"):
+        h5netcdf.File(tmp_local_netcdf, "a", swmr=True)
+    assert not pathlib.Path(tmp_local_netcdf).exists()
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": None}
+    with pytest.raises(ValueError, match="libver='latest'"):
+        h5netcdf.File(tmp_local_netcdf, "a", swmr=True)
+
+
+@requires_pyfive
+def test_swmr_pyfive(tmp_local_netcdf):
+    with h5netcdf.File(tmp_local_netcdf, "w") as f:
+        f.dimensions = {"time": None}
+    with pytest.raises(ValueError, match="only supported by the 'h5py' backend"):
+        h5netcdf.File(tmp_local_netcdf, "r", swmr=True, backend="pyfive")
@@ -0,0 +1,553 @@
+"""File level tools built on top of the h5netcdf API.
+
+:func:`repack` copies a complete netCDF4 file (groups, dimensions, user types,
+variables and attributes) into a new file with new chunking and filters.
+Variable data is streamed block by block, where each block is aligned to the
+destination chunk shape and bounded by a configurable memory budget.
+
+:func:`aggregate` concatenates files along a dimension into a small file of
+HDF5 virtual datasets, which refer to the data in the source files.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from .core import File
+
+#: default memory budget for a single data block (256 MiB)
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+_BYTE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def _parse_bytes(value):
+    """Parse human readable byte sizes like ``512M`` or ``2G`` into bytes."""
+    if isinstance(value, int):
+        return value
+    value = value.strip().upper().rstrip("IB").rstrip("B")
+    unit = value[-1] if value and value[-1] in _BYTE_UNITS else ""
+    number = value[: len(value) - len(unit)]
+    return int(float(number) * _BYTE_UNITS[unit])
+
+
+def _iter_blocks(shape, chunks, itemsize, memory_budget):
+    """Yield tuples of slices covering ``shape`` block by block.
+
+    Blocks are multiples of ``chunks`` (or single elements for contiguous
+    layouts), grown from the fastest varying axis outwards, as long as they
+    fit into ``memory_budget`` bytes. At least one chunk is always returned
+    per block, even if it exceeds the budget.
+    """
+    ndim = len(shape)
+    if ndim == 0:
+        yield ()
+        return
+    unit = list(chunks) if chunks else [1] * ndim
+    block = [min(u, max(s, 1)) for u, s in zip(unit, shape)]
+    for axis in reversed(range(ndim)):
+        nbytes = int(np.prod(block)) * itemsize
+        factor = max(1, memory_budget // max(nbytes, 1))
+        block[axis] = min(max(shape[axis], 1), block[axis] * factor)
+        if block[axis] < shape[axis]:
+            break
+    starts = [range(0, s, b) for s, b in zip(shape, block)]
+    for start in itertools.product(*starts):
+        yield tuple(slice(i, min(i + b, s)) for i, b, s in zip(start, block, shape))
+
+
+def _resolve_chunks(var, chunks, dim_chunks):
+    """Return destination chunk shape for ``var``.
+
+    ``chunks`` maps variable names (full path or plain name) to chunk tuples,
+    ``dim_chunks`` maps dimension names to chunk lengths along that
+    dimension. Entries in ``chunks`` take precedence. ``None`` returned
+    means contiguous or backend default layout.
+    """
+    shape = var._h5ds.shape
+    if not shape:
+        return None
+    for key in (var.name, var.name.lstrip("/"), var.name.split("/")[-1]):
+        if key in chunks:
+            spec = chunks[key]
+            if spec is None:
+                return None
+            spec = tuple(int(c) for c in np.atleast_1d(spec))
+            if len(spec) != len(shape):
+                raise ValueError(
+                    f"chunks {spec!r} for variable {var.name!r} do not match "
+                    f"its dimensions {var.dimensions!r}"
+                )
+            return spec
+    overrides = {
+        axis: dim_chunks[dim]
+        for axis, dim in enumerate(var.dimensions)
+        if dim in dim_chunks
+    }
+    base = var.chunks
+    if not overrides:
+        return base
+    if base is None:
+        base = tuple(max(s, 1) for s in shape)
+    return tuple(
+        int(overrides[axis]) if axis in overrides else c for axis, c in enumerate(base)
+    )
+
+
+def _filter_kwargs(var, compression, compression_opts, shuffle):
+    """Return filter keyword arguments for the destination variable."""
+    if not var._h5ds.shape:
+        # scalar datasets can't be chunked and thus not compressed
+        return {}
+    if compression is None:
+        # keep source filters
+        kwargs = {
+            "compression": var.compression,
+            "compression_opts": var.compression_opts,
+        }
+    elif compression:
+        kwargs = {"compression": compression, "compression_opts": compression_opts}
+    else:
+        kwargs = {}
+    kwargs["shuffle"] = var.shuffle if shuffle is None else shuffle
+    kwargs["fletcher32"] = var.fletcher32
+    # do not pass filters which are switched off
+    return {k: v for k, v in kwargs.items() if v not in (False, None)}
+
+
+def _copy_attrs(src, dst, skip=()):
+    for key, value in src.attrs.items():
+        if key not in skip:
+            dst.attrs[key] = value
+
+
+def _copy_usertypes(src, dst):
+    for name, enumtype in src.enumtypes.items():
+        basetype = np.dtype(enumtype.dtype.str)
+        dst.create_enumtype(basetype, name, enumtype.enum_dict)
+    for name, vltype in src.vltypes.items():
+        dst.create_vltype(vltype.dtype.metadata["vlen"], name)
+    for name, cmptype in src.cmptypes.items():
+        dst.create_cmptype(cmptype.dtype, name)
+
+
+def _copy_dimensions(src, dst):
+    for name, dim in src.dimensions.items():
+        if dim.isunlimited():
+            dst.dimensions[name] = None
+            dst.resize_dimension(name, dim.size)
+        else:
+            dst.dimensions[name] = dim.size
+
+
+def _destination_dtype(src_var, dst_group):
+    datatype = src_var.datatype
+    if isinstance(datatype, np.dtype):
+        return datatype
+    usertypes = dst_group._get_usertype_dict(datatype._h5type_identifier)
+    return usertypes[datatype.name]
+
+
+def _copy_variable(
+    src_var,
+    dst_group,
+    chunks,
+    dim_chunks,
+    compression,
+    compression_opts,
+    shuffle,
+    budget,
+):
+    name = src_var.name.split("/")[-1]
+    fillvalue = src_var.attrs.get("_FillValue", None)
+    dst_var = dst_group.create_variable(
+        name,
+        src_var.dimensions,
+        dtype=_destination_dtype(src_var, dst_group),
+        fillvalue=fillvalue,
+        chunks=_resolve_chunks(src_var, chunks, dim_chunks),
+        **_filter_kwargs(src_var, compression, compression_opts, shuffle),
+    )
+    _copy_attrs(src_var, dst_var, skip=("_FillValue",))
+
+    src_ds = src_var._h5ds
+    dst_ds = dst_var._h5ds
+    # variables might be shorter than their (unlimited) dimensions
+    if dst_ds.shape != src_ds.shape:
+        dst_ds.resize(src_ds.shape)
+
+    nbytes = 0
+    blocks = _iter_blocks(src_ds.shape, dst_ds.chunks, src_ds.dtype.itemsize, budget)
+    for block in blocks:
+        data = src_ds[block]
+        dst_ds[block] = data
+        nbytes += np.asarray(data).nbytes
+    return nbytes
+
+
+def _copy_group(src, dst, stats, **kwargs):
+    _copy_usertypes(src, dst)
+    _copy_dimensions(src, dst)
+    _copy_attrs(src, dst)
+    for var in src.variables.values():
+        stats["nbytes"] += _copy_variable(var, dst, **kwargs)
+        stats["variables"] += 1
+    for name, group in src.groups.items():
+        _copy_group(group, dst.create_group(name), stats, **kwargs)
+
+
+def repack(
+    src,
+    dst,
+    chunks=None,
+    dim_chunks=None,
+    compression=None,
+    compression_opts=None,
+    shuffle=None,
+    memory_budget=DEFAULT_MEMORY_BUDGET,
+    **kwargs,
+):
+    """Rewrite a netCDF4 file with new chunking and filters.
+
+    Dimensions (including unlimited ones), dimension scales, user types
+    (enum, vlen and compound), groups and attributes are preserved. Data is
+    streamed chunk-block by chunk-block, where every block fits into the
+    given memory budget.
+
+    Parameters
+    ----------
+    src : path-like
+        Location of the source netCDF4 file.
+    dst : path-like
+        Location of the file to create. Existing files are overwritten.
+    chunks : dict, optional
+        Mapping of variable names (full path or plain name) to chunk tuples
+        (``None`` for contiguous layout).
+    dim_chunks : dict, optional
+        Mapping of dimension names to chunk lengths along that dimension,
+        applied to all variables with the dimension which are not listed in
+        ``chunks``. Variables which are not affected keep their chunking.
+    compression : str or False, optional
+        Compression filter to apply to all non-scalar variables (eg. ``gzip``).
+        ``False`` removes compression, ``None`` (default) keeps the source
+        variables' filters.
+    compression_opts : int, optional
+        Parameter for the compression filter.
+    shuffle : bool, optional
+        Apply or remove the HDF5 shuffle filter. Defaults to ``None``, which
+        keeps the source variables' setting.
+    memory_budget : int or str, optional
+        Maximum size of a single data block in bytes (or as string like
+        ``"512M"``). Defaults to 256 MiB.
+    **kwargs :
+        Additional keyword arguments passed to :class:`h5netcdf.File` when
+        opening the source file (eg. ``phony_dims`` or ``backend``).
+
+    Returns
+    -------
+    stats : dict
+        Number of variables and bytes copied, elapsed time in seconds and
+        throughput in bytes per second.
+    """
+    chunks = {} if chunks is None else dict(chunks)
+    dim_chunks = {} if dim_chunks is None else dict(dim_chunks)
+    if compression == "zlib":
+        compression = "gzip"
+    budget = _parse_bytes(memory_budget)
+    if budget <= 0:
+        raise ValueError(f"memory_budget must be positive, got {memory_budget!r}")
+
+    stats = {"variables": 0, "nbytes": 0}
+    start = time.perf_counter()
+    with File(src, "r", **kwargs) as fsrc:
+        with File(dst, "w", format=fsrc.data_model) as fdst:
+            _copy_group(
+                fsrc,
+                fdst,
+                stats,
+                chunks=chunks,
+                dim_chunks=dim_chunks,
+                compression=compression,
+                compression_opts=compression_opts,
+                shuffle=shuffle,
+                budget=budget,
+            )
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = elapsed
+    stats["throughput"] = stats["nbytes"] / elapsed if elapsed > 0 else float("inf")
+    return stats
+
+
+def _scan_source(group, dim, variables, sizes):
+    """Collect HDF5 path and shape of all variables using ``dim``.
+
+    The sizes of the other dimensions are collected in ``sizes`` by path.
+    Returns the size of ``dim`` or None if no variable uses it.
+    """
+    size = None
+    for name, d in group.dimensions.items():
+        if name != dim and not d.isunlimited():
+            sizes[f"{group.name.rstrip('/')}/{name}"] = d.size
+    for var in group.variables.values():
+        if dim in var.dimensions:
+            h5ds = var._h5ds
+            variables[var.name] = (h5ds.name, h5ds.shape)
+            size = var._parent._all_dimensions[dim].size
+    for child in group.groups.values():
+        child_size = _scan_source(child, dim, variables, sizes)
+        size = child_size if size is None else size
+    return size
+
+
+def _source_name(path, out):
+    """Name of the source file as stored in the virtual dataset mapping.
+
+    Relative to the directory of the aggregate file, so that both can be
+    moved together.
+    """
+    path = os.path.abspath(os.fspath(path))
+    try:
+        return os.path.relpath(path, os.path.dirname(os.path.abspath(os.fspath(out))))
+    except ValueError:
+        # eg. different drives on Windows
+        return path
+
+
+def _virtual_layout(var, dim, total, sources, h5py):
+    """Return a virtual layout concatenating ``var`` of all sources along ``dim``."""
+    axis = var.dimensions.index(dim)
+    shape = list(var.shape)
+    shape[axis] = total
+    dtype = var._h5ds.dtype
+    layout = h5py.VirtualLayout(shape=tuple(shape), dtype=dtype)
+    offset = 0
+    for name, size, variables in sources:
+        if var.name not in variables:
+            raise ValueError(f"variable {var.name!r} is missing in {name!r}")
+        h5path, src_shape = variables[var.name]
+        other = [s for i, s in enumerate(src_shape) if i != axis]
+        if other != [s for i, s in enumerate(shape) if i != axis]:
+            raise ValueError(
+                f"shape {src_shape} of variable {var.name!r} in {name!r} does "
+                f"not match {tuple(shape)} apart from dimension {dim!r}"
+            )
+        if src_shape[axis]:
+            source = h5py.VirtualSource(name, h5path, shape=src_shape, dtype=dtype)
+            target = [slice(None)] * len(shape)
+            target[axis] = slice(offset, offset + src_shape[axis])
+            layout[tuple(target)] = source
+        offset += size
+    return layout
+
+
+def _aggregate_group(src, dst, dim, total, sources):
+    _copy_usertypes(src, dst)
+    for name, d in src.dimensions.items():
+        if name == dim:
+            dst.dimensions[name] = total
+        elif d.isunlimited():
+            dst.dimensions[name] = None
+            dst.resize_dimension(name, d.size)
+        else:
+            dst.dimensions[name] = d.size
+    _copy_attrs(src, dst)
+    h5py = dst._root._h5py
+    for var in src.variables.values():
+        if dim in var.dimensions:
+            virtual = dst._create_virtual_variable(
+                var.name.split("/")[-1],
+                var.dimensions,
+                _destination_dtype(var, dst),
+                _virtual_layout(var, dim, total, sources, h5py),
+                fillvalue=var.attrs.get("_FillValue", None),
+            )
+            _copy_attrs(var, virtual, skip=("_FillValue",))
+        else:
+            # variables without the dimension are taken from the first file
+            _copy_variable(
+                var,
+                dst,
+                chunks={},
+                dim_chunks={},
+                compression=None,
+                compression_opts=None,
+                shuffle=None,
+                budget=DEFAULT_MEMORY_BUDGET,
+            )
+    for name, group in src.groups.items():
+        _aggregate_group(group, dst.create_group(name), dim, total, sources)
+
+
+def aggregate(paths, out, dim="time", **kwargs):
+    """Concatenate netCDF4 files along a dimension using HDF5 virtual datasets.
+
+    A new file is written, where every variable using ``dim`` is a virtual
+    dataset mapping onto the corresponding variable of all source files.
+    Variables which do not use ``dim`` are copied from the first file, as
+    are dimensions, groups, user types and attributes. Only metadata is
+    written, so the aggregate is small and can be opened with a single
+    metadata scan, while reads are served directly from the source files.
+
+    The source files are referred to relative to the directory of ``out``,
+    so they have to be kept at the same relative location. In the aggregate
+    ``dim`` is a fixed size dimension.
+
+    Parameters
+    ----------
+    paths : sequence of path-like
+        Source files in concatenation order.
+    out : path-like
+        Location of the file to create. Existing files are overwritten.
+    dim : str, optional
+        Name of the dimension to concatenate along. Defaults to ``"time"``.
+    **kwargs :
+        Additional keyword arguments passed to :class:`h5netcdf.File` when
+        opening the source files (eg. ``phony_dims``).
+
+    Returns
+    -------
+    size : int
+        Size of ``dim`` in the aggregate.
+    """
+    import h5py
+
+    paths = list(paths)
+    if not paths:
+        raise ValueError("at least one source file is needed")
+    sources = []
+    fixed = None
+    for path in paths:
+        variables = {}
+        sizes = {}
+        with File(path, "r", **kwargs) as f:
+            size = _scan_source(f, dim, variables, sizes)
+        if size is None:
+            raise ValueError(f"no variable uses dimension {dim!r} in {path!r}")
+        if fixed is None:
+            fixed = sizes
+        for name in fixed.keys() & sizes.keys():
+            if fixed[name] != sizes[name]:
+                raise ValueError(
+                    f"size {sizes[name]} of dimension {name!r} in {path!r} does "
+                    f"not match {fixed[name]} in {paths[0]!r}"
+                )
+        sources.append((_source_name(path, out), size, variables))
+    total = sum(size for _, size, _ in sources)
+
+    with File(paths[0], "r", **kwargs) as template:
+        with File(out, "w", format=template.data_model, backend="h5py") as fout:
+            if fout._h5py is not h5py:
+                raise ValueError("aggregate needs the h5py backend")
+            _aggregate_group(template, fout, dim, total, sources)
+    return total
+
+
+def _parse_chunk_spec(spec):
+    name, sep, value = spec.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(
+            f"invalid chunk specification {spec!r}, use NAME=SIZE[,SIZE...]"
+        )
+    if value.lower() in ("none", "contiguous"):
+        return name, None
+    sizes = tuple(int(v) for v in value.split(","))
+    return name, sizes[0] if len(sizes) == 1 else sizes
+
+
+def _parse_dim_chunk_spec(spec):
+    name, sep, value = spec.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(
+            f"invalid dimension chunk specification {spec!r}, use DIM=SIZE"
+        )
+    try:
+        return name, int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid dimension chunk specification {spec!r}, use DIM=SIZE"
+        ) from None
+
+
+def repack_main(argv=None):
+    """Command line entry point for :func:`repack`."""
+    parser = argparse.ArgumentParser(
+        prog="h5netcdf-repack",
+        description="Rewrite a netCDF4 file with new chunking and filters.",
+    )
+    parser.add_argument("src", help="source netCDF4 file")
+    parser.add_argument("dst", help="destination netCDF4 file")
+    parser.add_argument(
+        "-c",
+        "--chunks",
+        action="append",
+        default=[],
+        type=_parse_chunk_spec,
+        metavar="NAME=SIZE[,SIZE...]",
+        help="chunking for a variable (sizes for all axes or 'none' for "
+        "contiguous layout), can be given multiple times",
+    )
+    parser.add_argument(
+        "-d",
+        "--dim-chunks",
+        action="append",
+        default=[],
+        type=_parse_dim_chunk_spec,
+        metavar="DIM=SIZE",
+        help="chunk length along a dimension for all variables not given "
+        "with --chunks, can be given multiple times",
+    )
+    parser.add_argument(
+        "--compression", help="compression filter, eg. gzip, or 'none' to remove"
+    )
+    parser.add_argument(
+        "--compression-opts", type=int, help="compression filter parameter"
+    )
+    parser.add_argument(
+        "--shuffle",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="apply or remove the shuffle filter",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        default=DEFAULT_MEMORY_BUDGET,
+        type=_parse_bytes,
+        help="maximum size of data blocks, eg. 512M (default: 256M)",
+    )
+    parser.add_argument(
+        "--phony-dims", choices=["sort", "access"], help="phony dimension handling"
+    )
+    args = parser.parse_args(argv)
+
+    compression = args.compression
+    if compression is not None and compression.lower() == "none":
+        compression = False
+    kwargs = {}
+    if args.phony_dims is not None:
+        kwargs["phony_dims"] = args.phony_dims
+
+    stats = repack(
+        args.src,
+        args.dst,
+        chunks=dict(args.chunks),
+        dim_chunks=dict(args.dim_chunks),
+        compression=compression,
+        compression_opts=args.compression_opts,
+        shuffle=args.shuffle,
+        memory_budget=args.memory_budget,
+        **kwargs,
+    )
+    mib = stats["nbytes"] / 1024**2
+    print(
+        f"repacked {stats['variables']} variables, {mib:.1f} MiB in "
+        f"{stats['seconds']:.2f} s ({stats['throughput'] / 1024**2:.1f} MiB/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(repack_main())